@@ -0,0 +1,76 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# asyncio front-end for a LinearGCS or BezierGCS. Solves run on a bounded
+# thread pool, which can be shared between several planners. A graph is
+# modified while a query is connected to it, so requests to the same planner
+# wait on a per-graph lock in the event loop instead of occupying pool
+# threads, and many requests can be awaited concurrently from one loop.
+#
+# Cancelling a request (or hitting its timeout) before its solve started
+# drops it from the queue. A conic solve that is already running cannot be
+# interrupted; it finishes in the background and the graph is released
+# afterwards, while the awaiting coroutine returns immediately.
+class AsyncPlanner:
+    def __init__(self, gcs, executor=None, max_workers=None):
+        self.gcs = gcs
+        self.owns_executor = executor is None
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count())
+        self.executor = executor
+        self.lock = asyncio.Lock()
+        self.num_pending = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    # Requests waiting for the graph plus the one being solved, e.g. for an
+    # orchestration layer balancing queries across planners.
+    def queueDepth(self):
+        return self.num_pending + (1 if self.lock.locked() else 0)
+
+    def close(self):
+        if self.owns_executor:
+            self.executor.shutdown(wait=False)
+
+    def solve(self, start, goal, rounding, preprocessing, kwargs):
+        query_results, _ = self.gcs.solveBatch(
+            [(np.asarray(start), np.asarray(goal))],
+            rounding=rounding, preprocessing=preprocessing, **kwargs)
+        return query_results[0]
+
+    # Returns the result dictionary of solveBatch for this single query; the
+    # trajectory is under "path". Keyword arguments are endpoint options such
+    # as velocity or zero_deriv_boundary for BezierGCS.
+    async def plan(self, start, goal, rounding=True, preprocessing=False, timeout=None, **kwargs):
+        return await asyncio.wait_for(
+            self.queuedPlan(start, goal, rounding, preprocessing, kwargs), timeout)
+
+    async def queuedPlan(self, start, goal, rounding, preprocessing, kwargs):
+        loop = asyncio.get_running_loop()
+        self.num_pending += 1
+        try:
+            await self.lock.acquire()
+        finally:
+            self.num_pending -= 1
+
+        try:
+            future = self.executor.submit(
+                self.solve, start, goal, rounding, preprocessing, kwargs)
+        except BaseException:
+            self.lock.release()
+            raise
+        # The lock follows the solve itself, not the awaiting coroutine.
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self.lock.release))
+        return await asyncio.wrap_future(future)
+
+    async def planMany(self, queries, timeout=None, **kwargs):
+        return await asyncio.gather(
+            *[self.plan(start, goal, timeout=timeout, **kwargs) for start, goal in queries],
+            return_exceptions=True)
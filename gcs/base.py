@@ -1,5 +1,8 @@
+import copy
 import pydot
 import numpy as np
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 from pydrake.geometry.optimization import (
     GraphOfConvexSets,
@@ -11,51 +14,75 @@ from pydrake.solvers import (
     GurobiSolver,
     MathematicalProgram,
     MosekSolver,
+    SolutionResult,
     SolverOptions,
 )
-from pydrake.all import le
 
-from gcs.rounding import MipPathExtraction
+from gcs import util
+from gcs.graph import GraphAdjacency
+from gcs.lower_bounds import LowerBoundGraph
+from gcs.preprocessing import pruneUnreachable
+from gcs.regions import RegionStore
+from gcs.restricted import RestrictionCache, pathVertices, solvePathProgram
+from gcs.search import bestFirstSearch
+from gcs.rounding import (
+    MipPathExtraction,
+    averageVertexPositions,
+    estimatePathCost,
+)
+from gcs.spatial import PointLocator, overlappingBoxPairs, overlappingBoxes
+from gcs.surrogate import corridorVertices, edgeLengths, kShortestPaths, shortestPath
 
-def polytopeDimension(A, b, tol=1e-4):
-    
-    assert A.shape[0] == b.size
-    
-    m, n = A.shape
-    eq = []
-
-    while True:
-        
-        ineq = [i for i in range(m) if i not in eq]
-        A_ineq = A[ineq]
-        b_ineq = b[ineq]
-
-        prog = MathematicalProgram()
-        x = prog.NewContinuousVariables(n)
-        r = prog.NewContinuousVariables(1)[0]
-        
-        if len(eq) > 0:
-            prog.AddLinearEqualityConstraint(A_eq.dot(x), b_eq)
-        if len(ineq) > 0:
-            c = prog.AddLinearConstraint(le(A_ineq.dot(x) + r * np.ones(len(ineq)), b_ineq))
-        prog.AddBoundingBoxConstraint(0, 1, r)
-        
-        prog.AddLinearCost(-r)
-
-        solver = MosekSolver()
-        result = solver.Solve(prog)
+class PolytopeDimensionProgram:
+    # Chebyshev-like LP used to find the implicit equalities of {x: Ax <= b}.
+    # Rows detected as equalities have their slack coefficient zeroed and
+    # their lower bound raised to b, so the same program is reused across
+    # iterations and across polytopes with the same number of rows.
+    def __init__(self, m, n):
+        self.m = m
+        self.n = n
+        self.prog = MathematicalProgram()
+        self.x = self.prog.NewContinuousVariables(n)
+        self.r = self.prog.NewContinuousVariables(1)[0]
+        self.constraint = self.prog.AddLinearConstraint(
+            np.zeros((m, n + 1)), -np.inf * np.ones(m), np.zeros(m),
+            np.append(self.x, self.r))
+        self.prog.AddBoundingBoxConstraint(0, 1, self.r)
+        self.prog.AddLinearCost(-self.r)
+        self.solver = MosekSolver()
 
-        if not result.is_success():
-            return -1
-        
-        if result.GetSolution(r) > tol:
-            eq_rank = 0 if len(eq) == 0 else np.linalg.matrix_rank(A_eq)
-            return n - eq_rank
-        
-        c_opt = np.abs(result.GetDualSolution(c)) 
-        eq += [ineq[i] for i, ci in enumerate(c_opt) if ci > tol]
-        A_eq = A[eq]
-        b_eq = b[eq]
+    def dimension(self, A, b, tol=1e-4):
+        assert A.shape == (self.m, self.n)
+        assert A.shape[0] == b.size
+
+        eq = np.zeros(self.m, dtype=bool)
+        while True:
+            slack = np.where(eq, 0., 1.)
+            self.constraint.evaluator().UpdateCoefficients(
+                np.hstack((A, slack[:, None])), np.where(eq, b, -np.inf), b)
+
+            result = self.solver.Solve(self.prog, None, None)
+            if not result.is_success():
+                return -1
+
+            if result.GetSolution(self.r) > tol:
+                eq_rank = 0 if not np.any(eq) else np.linalg.matrix_rank(A[eq])
+                return self.n - eq_rank
+
+            c_opt = np.abs(result.GetDualSolution(self.constraint))
+            eq |= ~eq & (c_opt > tol)
+
+def polytopeDimensions(A_stacks, b_stacks, tol=1e-4):
+    programs = {}
+    dimensions = []
+    for A, b in zip(A_stacks, b_stacks):
+        if A.shape not in programs:
+            programs[A.shape] = PolytopeDimensionProgram(*A.shape)
+        dimensions.append(programs[A.shape].dimension(A, b, tol))
+    return dimensions
+
+def polytopeDimension(A, b, tol=1e-4):
+    return polytopeDimensions([A], [b], tol)[0]
 
 class BaseGCS:
     def __init__(self, regions):
@@ -69,6 +96,24 @@ class BaseGCS:
         self.regions = regions.copy()
         self.rounding_fn = []
         self.rounding_kwargs = {}
+        self.rounding_workers = None
+        self.restricted_rounding = False
+        self.rounding_gap = None
+        self.reachability_pruning = False
+        self.corridor = None
+        self.best_first_search = None
+        self.restriction_cache = None
+        self.endpoint_terms = None
+        # Keyword arguments of addSourceTarget, reused by updateEndpoints.
+        self.endpoint_kwargs = {}
+        # Whether any edge may carry a phi constraint from a previous solve,
+        # and the path of that solve, used to seed rounding after
+        # updateEndpoints.
+        self.phi_constrained = False
+        self.last_path = None
+        self.seed_path = None
+        # Share of a time budget given to the relaxation; rounding gets the rest.
+        self.relaxation_budget_fraction = 0.5
         for r in self.regions:
             assert r.ambient_dimension() == self.dimension
 
@@ -76,21 +121,177 @@ class BaseGCS:
         self.options = GraphOfConvexSetsOptions()
         self.source = None
         self.target = None
+        # Ids of the endpoint vertices added for source and target points,
+        # the only vertices that replacing an endpoint may remove.
+        self.endpoint_ids = set()
+        self.region_store = RegionStore(self.regions)
+        self.region_vertices = []
+        self.point_locator = None
+        self.graph_adjacency = None
+        self.lower_bound_graph = None
+
+    def makeVertex(self, region, name):
+        self.graph_adjacency = None
+        return self.gcs.AddVertex(region, name)
+
+    def makeEdge(self, u, v):
+        self.graph_adjacency = None
+        return self.gcs.AddEdge(u, v, f"({u.name()}, {v.name()})")
+
+    # Adjacency of the current graph, rebuilt lazily after any change to it.
+    def adjacency(self):
+        if self.graph_adjacency is None:
+            self.graph_adjacency = GraphAdjacency(self.gcs)
+        return self.graph_adjacency
+
+    def addRegionVertices(self):
+        for i, r in enumerate(self.regions):
+            self.region_vertices.append(self.makeVertex(
+                r, self.names[i] if not self.names is None else ''))
+
+    def addRegionEdges(self, edges):
+        for ii, jj in edges:
+            self.makeEdge(self.region_vertices[ii], self.region_vertices[jj])
+
+    def addRegion(self, region, name=None, full_dim_overlap=False):
+        assert region.ambient_dimension() == self.dimension
+        ii = len(self.regions)
+        if name is None:
+            name = "v" + str(ii)
+
+        self.regions.append(region)
+        self.names.append(name)
+        self.region_store.append(region)
+        self.point_locator = None
+
+        # Only the regions whose boxes overlap the new one are tested.
+        lower, upper = self.boundingBoxes()
+        candidates = overlappingBoxes(lower[:ii], upper[:ii], lower[ii], upper[ii])
+
+        store = self.region_store
+        edges = []
+        for jj in candidates:
+            if full_dim_overlap:
+                A = np.vstack((store.A(jj), store.A(ii)))
+                b = np.concatenate((store.b(jj), store.b(ii)))
+                overlaps = polytopeDimension(A, b) >= self.dimension - 1
+            else:
+                overlaps = self.regions[jj].IntersectsWith(region)
+            if overlaps:
+                edges.append((int(jj), ii))
+                edges.append((ii, int(jj)))
+
+        self.region_vertices.append(self.makeVertex(region, name))
+        self.addRegionEdges(edges)
+        self.lower_bound_graph = None
+        return edges
+
+    def removeRegion(self, ii):
+        # Removing the vertex also removes every edge incident to it. Indices
+        # of the regions after ii shift down by one.
+        self.gcs.RemoveVertex(self.region_vertices[ii])
+        self.graph_adjacency = None
+        self.last_path = None
+        self.seed_path = None
+        del self.region_vertices[ii]
+        del self.regions[ii]
+        del self.names[ii]
+        self.region_store.remove(ii)
+        self.point_locator = None
+        self.lower_bound_graph = None
+
+    def boundingBoxes(self):
+        return self.region_store.boundingBoxes()
+
+    def pointLocator(self):
+        if self.point_locator is None:
+            store = self.region_store
+            lower, upper = store.boundingBoxes()
+            self.point_locator = PointLocator(
+                store.A_stack, store.b_stack, store.offsets, lower, upper)
+        return self.point_locator
+
+    def addSourceTarget(self, source, target, edges=None, **kwargs):
+        self.graph_adjacency = None
+        for v in [self.source, self.target]:
+            self.removeEndpoint(v)
+        self.source = None
+        self.target = None
+        self.last_path = None
+        self.seed_path = None
+
+        self.source, self.target, source_edges, target_edges = \
+            self.connectEndpoints(source, target, edges, **kwargs)
+        self.endpoint_kwargs = kwargs
+        return source_edges, target_edges
+
+    # Moves the source and/or the target of the current graph. Only the
+    # vertex of a moved endpoint and its edges are replaced; all other
+    # vertices, edges and their constraints stay in place. The best path of
+    # the previous solve, rewired to the new endpoints, is added to the
+    # candidates of the next rounding. The new edges are bound with the
+    # keyword arguments of addSourceTarget, overridden by those given here.
+    def updateEndpoints(self, source=None, target=None, **kwargs):
+        assert self.source is not None and self.target is not None
+        kwargs = {**self.endpoint_kwargs, **kwargs}
+        self.endpoint_kwargs = kwargs
+        locator = self.pointLocator()
+        source_regions = [] if source is None else locator.locate(source)
+        target_regions = [] if target is None else locator.locate(target)
+        if source is not None and not len(source_regions) > 0:
+            raise ValueError('Source vertex is not connected.')
+        if target is not None and not len(target_regions) > 0:
+            raise ValueError('Target vertex is not connected.')
+
+        # Only vertices that survive the update may be touched afterwards.
+        seed = None
+        if self.last_path is not None:
+            seed = (self.last_path[0].v(), self.last_path[1:-1], self.last_path[-1].u())
+        self.last_path = None
+
+        vertices = self.region_vertices
+        source_edges = []
+        target_edges = []
+        if source is not None:
+            assert len(source) == self.dimension
+            self.removeEndpoint(self.source)
+            self.source = self.addEndpoint(source, "source")
+            for ii in source_regions:
+                u = vertices[ii]
+                source_edges.append(self.gcs.AddEdge(self.source, u, f"(source, {u.name()})"))
+        if target is not None:
+            assert len(target) == self.dimension
+            self.removeEndpoint(self.target)
+            self.target = self.addEndpoint(target, "target")
+            for ii in target_regions:
+                u = vertices[ii]
+                target_edges.append(self.gcs.AddEdge(u, self.target, f"({u.name()}, target)"))
+        self.graph_adjacency = None
+        self.noteEndpointTerms(kwargs)
+        self.bindEndpointEdges(source_edges, target_edges, **kwargs)
+
+        if self.phi_constrained:
+            for edge in self.gcs.Edges():
+                edge.ClearPhiConstraints()
+            self.phi_constrained = False
 
-    def addSourceTarget(self, source, target, edges=None):
-        if self.source is not None or self.target is not None:
-            self.gcs.RemoveVertex(self.source)
-            self.gcs.RemoveVertex(self.target)
+        self.seed_path = None
+        if seed is not None:
+            adjacency = self.adjacency()
+            first = adjacency.edge(self.source, seed[0])
+            last = adjacency.edge(seed[2], self.target)
+            if first is not None and last is not None:
+                self.seed_path = [first] + seed[1] + [last]
+        return source_edges, target_edges
 
+    # Add a source and a target vertex, connect them to the regions that
+    # contain them and bind the class specific costs and constraints. The
+    # vertices are only added once both endpoints are known to be connected.
+    def connectEndpoints(self, source, target, edges=None, **kwargs):
+        self.graph_adjacency = None
         assert len(source) == self.dimension
         assert len(target) == self.dimension
 
-        vertices = self.gcs.Vertices()
-        # Add edges connecting source and target to graph
-        self.source = self.gcs.AddVertex(Point(source), "source")
-        self.target = self.gcs.AddVertex(Point(target), "target")
-
-        # Add edges connecting source and target to graph
         if edges is None:
             edges = self.findStartGoalEdges(source, target)
 
@@ -99,35 +300,88 @@ class BaseGCS:
         if not (len(edges[1]) > 0):
             raise ValueError('Target vertex is not connected.')
 
+        vertices = self.region_vertices
+        source_vertex = self.addEndpoint(source, "source")
+        target_vertex = self.addEndpoint(target, "target")
+
         source_edges = []
         target_edges = []
         for ii in edges[0]:
             u = vertices[ii]
-            edge = self.gcs.AddEdge(self.source, u, f"(source, {u.name()})")
+            edge = self.gcs.AddEdge(source_vertex, u, f"(source, {u.name()})")
             source_edges.append(edge)
 
         for ii in edges[1]:
             u = vertices[ii]
-            edge = self.gcs.AddEdge(u, self.target, f"({u.name()}, target)")
+            edge = self.gcs.AddEdge(u, target_vertex, f"({u.name()}, target)")
             target_edges.append(edge)
 
-        return source_edges, target_edges
+        self.noteEndpointTerms(kwargs)
+        self.bindEndpointEdges(source_edges, target_edges, **kwargs)
+        return source_vertex, target_vertex, source_edges, target_edges
+
+    def bindEndpointEdges(self, source_edges, target_edges):
+        pass
+
+    def addEndpoint(self, x, name):
+        v = self.gcs.AddVertex(Point(x), name)
+        self.endpoint_ids.add(v.id())
+        return v
+
+    # Removes v if it is an endpoint vertex. A region vertex stored as
+    # source or target (LinearGCS with explicit edges) stays in the graph.
+    def removeEndpoint(self, v):
+        if v is not None and v.id() in self.endpoint_ids:
+            self.endpoint_ids.discard(v.id())
+            self.gcs.RemoveVertex(v)
+
+    # Point of a vertex's set built from the Chebyshev center of its region.
+    def vertexCenter(self, center):
+        return center
+
+    # Fallback positions of the region and endpoint vertices, from the
+    # centers cached in the region store. Endpoints default to the current
+    # source and target.
+    def vertexCenters(self, endpoints=None):
+        if endpoints is None:
+            endpoints = [self.source, self.target]
+        centers = {v.id(): self.vertexCenter(c) for v, c in
+                   zip(self.region_vertices, self.region_store.chebyshevCenters())}
+        for v in endpoints:
+            if v is not None and v.id() in self.endpoint_ids:
+                centers[v.id()] = v.set().x()
+        return centers
+
+    # Whether every region still has its vertex in the graph.
+    def regionsIntact(self):
+        ids = set(v.id() for v in self.gcs.Vertices())
+        return all(v.id() in ids for v in self.region_vertices)
+
+    # Cached restrictions key endpoint edges by their coordinates, so they
+    # are dropped when the endpoint edges are bound with other arguments.
+    def noteEndpointTerms(self, kwargs):
+        terms = repr(sorted((k, v) for k, v in kwargs.items() if v is not None))
+        if terms != self.endpoint_terms:
+            self.endpoint_terms = terms
+            self.clearRestrictionCache()
+
+    def extractPath(self, best_path, best_result, target):
+        raise NotImplementedError
 
     def addSource(self, source):
-        if self.source is not None:
-            self.gcs.RemoveVertex(self.source)
+        self.graph_adjacency = None
+        self.removeEndpoint(self.source)
+        self.last_path = None
+        self.seed_path = None
 
         assert len(source) == self.dimension
 
-        vertices = self.gcs.Vertices()
+        vertices = self.region_vertices
         # Add edges connecting source and target to graph
-        self.source = self.gcs.AddVertex(Point(source), "source")
+        self.source = self.addEndpoint(source, "source")
 
         # Add edges connecting source and target to graph
-        edges = [[], []]
-        for ii in range(len(self.regions)):
-            if self.regions[ii].PointInSet(source):
-                edges[0].append(ii)
+        edges = [self.pointLocator().locate(source), []]
 
         if not (len(edges[0]) > 0):
             raise ValueError('Source vertex is not connected.')
@@ -141,20 +395,19 @@ class BaseGCS:
         return source_edges
 
     def addTarget(self, target):
-        if self.target is not None:
-            self.gcs.RemoveVertex(self.target)
+        self.graph_adjacency = None
+        self.removeEndpoint(self.target)
+        self.last_path = None
+        self.seed_path = None
 
         assert len(target) == self.dimension
 
-        vertices = self.gcs.Vertices()
+        vertices = self.region_vertices
         # Add edges connecting source and target to graph
-        self.target = self.gcs.AddVertex(Point(target), "target")
+        self.target = self.addEndpoint(target, "target")
 
         # Add edges connecting source and target to graph
-        edges = [[], []]
-        for ii in range(len(self.regions)):
-            if self.regions[ii].PointInSet(target):
-                edges[1].append(ii)
+        edges = [[], self.pointLocator().locate(target)]
 
         if not (len(edges[1]) > 0):
             raise ValueError('Target vertex is not connected.')
@@ -167,42 +420,72 @@ class BaseGCS:
 
         return target_edges
 
+    def findEdges(self, full_dim_overlap=False, workers=None, cache_dir=None):
+        if cache_dir is None:
+            cache_dir = util.EdgeCacheDir()
+        mode = "full_dimension" if full_dim_overlap else "overlap"
+        if cache_dir is not None:
+            key = util.EdgeCacheKey(self.region_store, mode)
+            edges = util.LoadCachedEdges(cache_dir, key)
+            if edges is not None:
+                return edges
+
+        if full_dim_overlap:
+            edges = self.findEdgesViaFullDimensionOverlaps(workers)
+        else:
+            edges = self.findEdgesViaOverlaps()
+
+        if cache_dir is not None:
+            util.SaveCachedEdges(cache_dir, key, edges)
+        return edges
+
     def findEdgesViaOverlaps(self):
+        # Only regions with overlapping bounding boxes can intersect.
+        lower, upper = self.boundingBoxes()
         edges = []
-        for ii in range(len(self.regions)):
-            for jj in range(ii + 1, len(self.regions)):
-                if self.regions[ii].IntersectsWith(self.regions[jj]):
-                    edges.append((ii, jj))
-                    edges.append((jj, ii))
+        for ii, jj in overlappingBoxPairs(lower, upper):
+            if self.regions[ii].IntersectsWith(self.regions[jj]):
+                edges.append((ii, jj))
+                edges.append((jj, ii))
         return edges
 
-    def findEdgesViaFullDimensionOverlaps(self):
+    def findEdgesViaFullDimensionOverlaps(self, workers=None):
+        lower, upper = self.boundingBoxes()
+        pairs = overlappingBoxPairs(lower, upper)
+        store = self.region_store
+        A_stacks = [np.vstack((store.A(ii), store.A(jj))) for ii, jj in pairs]
+        b_stacks = [np.concatenate((store.b(ii), store.b(jj))) for ii, jj in pairs]
+
+        if workers is None or workers <= 1:
+            dimensions = polytopeDimensions(A_stacks, b_stacks)
+        else:
+            # Only plain arrays are sent to the workers, Drake objects stay
+            # here. Each chunk reuses one LP per stack shape.
+            chunk = max(1, len(pairs) // (4 * workers))
+            A_chunks = [A_stacks[k:k + chunk] for k in range(0, len(pairs), chunk)]
+            b_chunks = [b_stacks[k:k + chunk] for k in range(0, len(pairs), chunk)]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                dimensions = [dim for dims in executor.map(
+                    polytopeDimensions, A_chunks, b_chunks) for dim in dims]
+
         edges = []
-        for ii in range(len(self.regions)):
-            for jj in range(ii + 1, len(self.regions)):
-                A = np.vstack((self.regions[ii].A(), self.regions[jj].A()))
-                b = np.concatenate((self.regions[ii].b(), self.regions[jj].b()))
-                if polytopeDimension(A, b) >= self.dimension - 1:
-                    edges.append((ii, jj))
-                    edges.append((jj, ii))
+        for (ii, jj), dim in zip(pairs, dimensions):
+            if dim >= self.dimension - 1:
+                edges.append((ii, jj))
+                edges.append((jj, ii))
         return edges
 
     def findStartGoalEdges(self, start, goal):
-        edges = [[], []]
-        for ii in range(len(self.regions)):
-            if ii==4: continue
-            if self.regions[ii].PointInSet(start):
-                edges[0].append(ii)
-            if self.regions[ii].PointInSet(goal):
-                edges[1].append(ii)
-        print(edges)
-        return edges
+        locator = self.pointLocator()
+        return [locator.locate(start), locator.locate(goal)]
 
     def setSolver(self, solver):
         self.options.solver = solver
+        self.clearRestrictionCache()
 
     def setSolverOptions(self, options):
         self.options.solver_options = options
+        self.clearRestrictionCache()
 
     def setPaperSolverOptions(self):
         solver_options = SolverOptions()
@@ -214,6 +497,7 @@ class BaseGCS:
         solver_options.SetOption(GurobiSolver.id(), "MIPGap", 1e-3)
         solver_options.SetOption(GurobiSolver.id(), "TimeLimit", 3600.0)
         self.options.solver_options = solver_options
+        self.clearRestrictionCache()
 
     def setRoundingStrategy(self, rounding_fn, **kwargs):
         self.rounding_kwargs = kwargs
@@ -228,15 +512,243 @@ class BaseGCS:
             raise ValueError("Rounding strategy must either be "
                              "a function or list of functions.")
 
+    # With more than one worker, every rounded path is solved concurrently as
+    # its own path-restricted program instead of re-solving the shared graph.
+    def setRoundingWorkers(self, workers):
+        self.rounding_workers = workers
+
+    # Solve rounded paths as path-restricted programs, which only contain the
+    # path's vertices and edges. Their results hold no phi variables, so
+    # only path edges can be queried.
+    def setRestrictedRounding(self, restricted=True):
+        self.restricted_rounding = restricted
+
+    # Solve rounded paths best-first, ranked by their cost at the flow
+    # averaged vertex positions of the relaxation, and stop once the best
+    # rounded cost is within relative_gap of the relaxation cost.
+    def setRoundingGap(self, relative_gap):
+        self.rounding_gap = relative_gap
+
+    # Edges between regions as pairs of region indices, in the order of the
+    # graph's edges.
+    def regionEdges(self):
+        region_index = {v.id(): ii for ii, v in enumerate(self.region_vertices)}
+        return [(region_index[e.u().id()], region_index[e.v().id()])
+                for e in self.adjacency().edges
+                if e.u().id() in region_index and e.v().id() in region_index]
+
+    # Factor by which the cost of a path is at least its length. Subclasses
+    # that know their costs return something tighter than zero.
+    def lowerBoundScale(self):
+        return 0.
+
+    def lowerBoundGraph(self, cache_dir=None):
+        if self.lower_bound_graph is None:
+            self.lower_bound_graph = LowerBoundGraph(
+                self.regions, self.regionEdges(), cache_dir)
+        return self.lower_bound_graph
+
+    # Admissible lower bounds on the cost of any source-target path through
+    # each region (vertex_bounds) and through each edge of regionEdges()
+    # (edge_bounds).
+    def lowerBounds(self, source, target, cache_dir=None):
+        vertex_bounds, edge_bounds = self.lowerBoundGraph(cache_dir).pathBounds(source, target)
+        scale = self.lowerBoundScale()
+        return scale * vertex_bounds, scale * edge_bounds
+
+    # Turns off every region edge whose lower bound exceeds the cost of an
+    # incumbent solution, and returns how many were turned off.
+    def pruneByLowerBound(self, incumbent, cache_dir=None):
+        assert self.source is not None and self.target is not None
+        _, edge_bounds = self.lowerBounds(
+            self.source.set().x(), self.target.set().x(), cache_dir)
+        adjacency = self.adjacency()
+        region_edges = self.lowerBoundGraph().edges
+        removed = 0
+        for (ii, jj), bound in zip(region_edges, edge_bounds):
+            if bound > incumbent:
+                adjacency.edge(self.region_vertices[ii], self.region_vertices[jj]) \
+                    .AddPhiConstraint(False)
+                removed += 1
+        if removed > 0:
+            self.phi_constrained = True
+        return removed
+
+    # Before solving, turn off every edge that graph search alone shows
+    # cannot lie on a source-target path.
+    def setReachabilityPruning(self, prune=True):
+        self.reachability_pruning = prune
+
+    # Before solving, restrict the graph to the k shortest paths between the
+    # region Chebyshev centers plus all regions within halo hops of them.
+    def setCorridor(self, k=5, halo=1):
+        self.corridor = None if k is None else (k, halo)
+
+    # Turns off every edge with an endpoint outside the corridor.
+    def restrictToCorridor(self, source, target, k, halo):
+        start_time = time.time()
+        adjacency = self.adjacency()
+        weights = edgeLengths(adjacency, self.surrogatePositions())
+        paths = kShortestPaths(adjacency, weights,
+                               adjacency.index(source), adjacency.index(target), k)
+        # Without a surrogate path the corridor would be empty, so nothing
+        # is restricted.
+        inside = corridorVertices(adjacency, paths, halo) if len(paths) > 0 \
+            else np.ones(len(adjacency.vertices), dtype=bool)
+        outside = ~(inside[adjacency.tails] & inside[adjacency.heads])
+        for kk in np.flatnonzero(outside):
+            adjacency.edges[kk].AddPhiConstraint(False)
+        self.phi_constrained = True
+        return {"total": time.time() - start_time,
+                "paths": len(paths),
+                "vertices": int(np.sum(inside)),
+                "edges": int(np.sum(~outside)),
+                "vertex_fraction": np.mean(inside),
+                "edge_fraction": np.mean(~outside)}
+
+    # Memoize path-restricted solves in an LRU cache of at most max_entries
+    # solutions and max_bytes bytes of solution values. Repeated paths, within
+    # a solve or across queries on the same graph, are then not solved again.
+    # Costs or constraints added to existing edges outside of the class
+    # methods require clearRestrictionCache.
+    def setRestrictionCache(self, max_entries=1024, max_bytes=None):
+        self.restriction_cache = None if max_entries is None \
+            else RestrictionCache(max_entries, max_bytes)
+
+    def clearRestrictionCache(self):
+        if self.restriction_cache is not None:
+            self.restriction_cache.clear()
+
+    # Region edges are keyed by id. Edges of an endpoint, which is recreated
+    # by every query, are keyed by its coordinates and the region they join.
+    def restrictionKey(self, path_edges):
+        key = []
+        for edge in path_edges:
+            u_set, v_set = edge.u().set(), edge.v().set()
+            if isinstance(u_set, Point):
+                key.append(("source", tuple(u_set.x()), edge.v().id()))
+            elif isinstance(v_set, Point):
+                key.append(("target", edge.u().id(), tuple(v_set.x())))
+            else:
+                key.append(edge.id())
+        return tuple(key)
+
+    def solveRestriction(self, path_edges, solver_options=None):
+        if self.restriction_cache is None:
+            return solvePathProgram(path_edges, self.options.solver, solver_options)
+        key = self.restrictionKey(path_edges)
+        cached = self.restriction_cache.get(key, path_edges)
+        if cached is not None:
+            return cached
+        result = solvePathProgram(path_edges, self.options.solver, solver_options)
+        self.restriction_cache.put(key, path_edges, result)
+        return result
+
+    # Solve by best-first search over paths of convex restrictions instead of
+    # the relaxation, guided by the lower bound graph's cost-to-go (see
+    # gcs.search). The rounding and preprocessing arguments of SolvePath are
+    # then ignored. The search returns the first path to reach the target;
+    # with heuristic_weight > 1 it is weighted A*.
+    def setBestFirstSearch(self, search=True, heuristic_weight=1., max_expansions=None,
+                           cache_dir=None):
+        self.best_first_search = None if not search else {
+            "heuristic_weight": heuristic_weight,
+            "max_expansions": max_expansions,
+            "cache_dir": cache_dir}
+
+    # Admissible cost-to-go of every vertex of the adjacency. Vertices other
+    # than the regions and the endpoints (e.g. left from another query) are
+    # never entered.
+    def costToGoHeuristic(self, target, cache_dir=None):
+        adjacency = self.adjacency()
+        heuristic = np.full(len(adjacency.vertices), np.inf)
+        vertex_bounds, _ = self.lowerBoundGraph(cache_dir).costToGo(target.set().x())
+        for v, bound in zip(self.region_vertices, vertex_bounds):
+            heuristic[adjacency.index(v)] = self.lowerBoundScale() * bound
+        heuristic[adjacency.index(self.source)] = 0.
+        heuristic[adjacency.index(target)] = 0.
+        return heuristic
+
+    def solveBestFirstSearch(self, verbose, deadline, solver_options):
+        results_dict = {}
+        adjacency = self.adjacency()
+        options = self.best_first_search
+        heuristic = self.costToGoHeuristic(self.target, options["cache_dir"])
+        solve_fn = lambda path_edges: self.solveRestriction(
+            path_edges, self.options.solver_options)
+        best_path, best_result, results_dict["search"] = bestFirstSearch(
+            adjacency, adjacency.index(self.source), adjacency.index(self.target),
+            heuristic, solve_fn, options["heuristic_weight"], options["max_expansions"],
+            self.rounding_workers, deadline)
+        if verbose:
+            print("Best-first search:", results_dict["search"]["expansions"], "expansions,",
+                  results_dict["search"]["reexpansions"], "re-expansions")
+
+        if best_path is None:
+            print("Best-first search did not reach the target.")
+            if deadline is not None:
+                return self.solveGreedyFallback(results_dict, "search", solver_options, deadline)
+            return None, None, results_dict
+        if deadline is not None:
+            results_dict["stopped_stage"] = "complete"
+        results_dict["best_path"] = best_path
+        results_dict["best_result"] = best_result
+        results_dict["rounded_cost"] = best_result.get_optimal_cost()
+        return best_path, best_result, results_dict
+
+    # Copy of the solver options whose time limits end the solve after
+    # time_limit seconds.
+    def budgetedSolverOptions(self, solver_options, time_limit):
+        if solver_options is None:
+            solver_options = SolverOptions()
+        else:
+            solver_options = copy.copy(solver_options)
+        time_limit = max(time_limit, 1e-3)
+        solver_options.SetOption(MosekSolver.id(), "MSK_DPAR_OPTIMIZER_MAX_TIME", time_limit)
+        solver_options.SetOption(MosekSolver.id(), "MSK_DPAR_MIO_MAX_TIME", time_limit)
+        solver_options.SetOption(GurobiSolver.id(), "TimeLimit", time_limit)
+        return solver_options
+
+    # Representative point of every vertex of the adjacency: the Chebyshev
+    # center for regions and the point itself for source and target vertices.
+    def surrogatePositions(self):
+        adjacency = self.adjacency()
+        centers = self.region_store.chebyshevCenters()
+        region_index = {v.id(): ii for ii, v in enumerate(self.region_vertices)}
+        positions = np.empty((len(adjacency.vertices), self.dimension))
+        for i, v in enumerate(adjacency.vertices):
+            if v.id() in region_index:
+                positions[i] = centers[region_index[v.id()]]
+            else:
+                positions[i] = v.set().x()
+        return positions
+
+    # Shortest path between the Chebyshev centers of the regions, used when
+    # there is no time left to round a relaxation.
+    def greedyPath(self, source, target):
+        adjacency = self.adjacency()
+        weights = edgeLengths(adjacency, self.surrogatePositions())
+        path = shortestPath(adjacency, weights, adjacency.index(source), adjacency.index(target))
+        if path is None:
+            return None
+        return [adjacency.edges[k] for k in path]
+
     def ResetGraph(self, vertices=None):
         if vertices is None:
-            vertices = [self.source, self.target]
+            self.removeEndpoint(self.source)
+            self.removeEndpoint(self.target)
             self.source = None
             self.target = None
-        for v in vertices:
-            self.gcs.RemoveVertex(v)
+        else:
+            for v in vertices:
+                self.endpoint_ids.discard(v.id())
+                self.gcs.RemoveVertex(v)
+        self.graph_adjacency = None
+        self.last_path = None
+        self.seed_path = None
         for edge in self.gcs.Edges():
             edge.ClearPhiConstraints()
+        self.phi_constrained = False
 
     def VisualizeGraph(self, file_type="svg"):
         graphviz = self.gcs.GetGraphvizString(None, False)
@@ -249,13 +761,151 @@ class BaseGCS:
             raise ValueError("Unrecognized file type:", file_type)
 
 
-    def solveGCS(self, rounding, preprocessing, verbose):
+    # Hook for subclasses that defer binding costs and constraints until the
+    # graph is solved.
+    def finalize(self):
+        pass
+
+    def solveRoundedPaths(self, active_edges):
+        if self.rounding_workers is not None and self.rounding_workers > 1:
+            with ThreadPoolExecutor(max_workers=self.rounding_workers) as executor:
+                futures = [None if path_edges is None else executor.submit(
+                    self.solveRestriction, path_edges, self.options.solver_options)
+                    for path_edges in active_edges]
+                return [None if f is None else f.result() for f in futures]
 
+        rounded_results = []
+        for path_edges in active_edges:
+            if path_edges is None:
+                rounded_results.append(None)
+            elif self.restricted_rounding:
+                rounded_results.append(self.solveRestriction(
+                    path_edges, self.options.solver_options))
+            else:
+                path_ids = set(edge.id() for edge in path_edges)
+                self.phi_constrained = True
+                for edge in self.adjacency().edges:
+                    edge.AddPhiConstraint(edge.id() in path_ids)
+                rounded_results.append(self.gcs.SolveShortestPath(
+                    self.source, self.target, self.options))
+        return rounded_results
+
+    def solveRoundedPathsBestFirst(self, active_edges, relaxation_result, deadline=None):
+        order = [k for k in range(len(active_edges)) if active_edges[k] is not None]
+        # Ranking only pays off with a gap to stop at, and not once the
+        # deadline has passed.
+        if self.rounding_gap is not None and (deadline is None or time.time() < deadline):
+            path_vertices = {v.id(): v for k in order for v in pathVertices(active_edges[k])}
+            vertex_data = averageVertexPositions(
+                self.gcs, relaxation_result, self.target, adjacency=self.adjacency(),
+                centers=self.vertexCenters(), vertices=path_vertices.values())
+            estimates = [estimatePathCost(path_edges, vertex_data)
+                         for path_edges in active_edges]
+            order = [k for k in np.argsort(estimates, kind="stable")
+                     if active_edges[k] is not None]
+
+        # Paths are solved in waves of one path per rounding worker.
+        wave = 1 if self.rounding_workers is None else max(1, self.rounding_workers)
+        lower_bound = relaxation_result.get_optimal_cost()
+        rounded_results = [None] * len(active_edges)
+        best_cost = np.inf
+        num_solved = 0
+        last_results = []
+        solver_options = self.options.solver_options
+        for start in range(0, len(order), wave):
+            if (self.rounding_gap is not None
+                and best_cost - lower_bound <= self.rounding_gap * np.abs(lower_bound)):
+                break
+            if deadline is not None:
+                if time.time() >= deadline:
+                    break
+                self.options.solver_options = self.budgetedSolverOptions(
+                    solver_options, deadline - time.time())
+            batch = order[start:start + wave]
+            batch_results = self.solveRoundedPaths([active_edges[k] for k in batch])
+            last_results = batch_results
+            for k, rounded_result in zip(batch, batch_results):
+                rounded_results[k] = rounded_result
+                num_solved += 1
+                if rounded_result.is_success():
+                    best_cost = min(best_cost, rounded_result.get_optimal_cost())
+
+        self.options.solver_options = solver_options
+        # Out of time if paths were skipped at the deadline or the last
+        # solves were cut off by their time limit.
+        out_of_time = deadline is not None and time.time() >= deadline and (
+            num_solved < len(order) or any(self.timedOut(r) for r in last_results))
+        return rounded_results, len(order) - num_solved, out_of_time
+
+    # A solve that neither found a solution nor proved infeasibility, such as
+    # one stopped by its time limit.
+    def timedOut(self, result):
+        return not result.is_success() and \
+            result.get_solution_result() != SolutionResult.kInfeasibleConstraints
+
+    # With a time_budget in seconds, the relaxation gets the solver time
+    # limit relaxation_budget_fraction * time_budget and rounded paths are
+    # solved best-first until the budget runs out. If no rounded path was
+    # solved by then, the greedy path between region centers is solved
+    # instead. results_dict["stopped_stage"] tells whether the budget ran out
+    # in the "relaxation" (or "mip"), in "rounding", or not at all
+    # ("complete").
+    def solveGCS(self, rounding, preprocessing, verbose, time_budget=None):
+        self.finalize()
+        solver_options = self.options.solver_options
+        deadline = None
+        if time_budget is not None:
+            deadline = time.time() + time_budget
+            first_budget = time_budget * (self.relaxation_budget_fraction if rounding else 1.)
+            self.options.solver_options = self.budgetedSolverOptions(
+                solver_options, first_budget)
+        try:
+            if self.best_first_search is not None:
+                best_path, best_result, results_dict = self.solveBestFirstSearch(
+                    verbose, deadline, solver_options)
+            else:
+                best_path, best_result, results_dict = self.solveGCSStages(
+                    rounding, preprocessing, verbose, deadline, solver_options)
+        finally:
+            self.options.solver_options = solver_options
+            self.seed_path = None
+        self.last_path = best_path
+        if self.restriction_cache is not None:
+            results_dict["restriction_cache"] = self.restriction_cache.stats()
+        return best_path, best_result, results_dict
+
+    # The greedy path is solved within what is left of the budget.
+    def solveGreedyFallback(self, results_dict, stage, solver_options, deadline):
+        results_dict["stopped_stage"] = stage
+        best_path = self.greedyPath(self.source, self.target)
+        results_dict["greedy_fallback"] = True
+        if best_path is None:
+            return None, None, results_dict
+        best_result = self.solveRestriction(best_path, self.budgetedSolverOptions(
+            solver_options, deadline - time.time()))
+        results_dict["best_path"] = best_path
+        results_dict["best_result"] = best_result
+        results_dict["rounded_cost"] = best_result.get_optimal_cost()
+        if not best_result.is_success():
+            return None, best_result, results_dict
+        return best_path, best_result, results_dict
+
+    def solveGCSStages(self, rounding, preprocessing, verbose, deadline, solver_options):
         results_dict = {}
         self.options.convex_relaxation = rounding
         self.options.preprocessing = preprocessing
         self.options.max_rounded_paths = 0
 
+        if self.corridor is not None:
+            results_dict["corridor"] = self.restrictToCorridor(
+                self.source, self.target, *self.corridor)
+            if verbose:
+                print("Corridor keeps", results_dict["corridor"]["edges"], "edges")
+        if self.reachability_pruning:
+            results_dict["pruning"] = pruneUnreachable(
+                self.gcs, self.source, self.target, verbose, self.adjacency())
+            self.phi_constrained = True
+
         result = self.gcs.SolveShortestPath(self.source, self.target, self.options)
 
         if rounding:
@@ -269,6 +919,9 @@ class BaseGCS:
 
         if not result.is_success():
             print("First solve failed")
+            if deadline is not None:
+                return self.solveGreedyFallback(
+                    results_dict, "relaxation" if rounding else "mip", solver_options, deadline)
             return None, None, results_dict
 
         if verbose:
@@ -282,46 +935,57 @@ class BaseGCS:
             # Extract path
             active_edges = []
             found_path = False
+            rounding_kwargs = {"centers": self.vertexCenters(), **self.rounding_kwargs}
             for fn in self.rounding_fn:
                 rounded_edges = fn(self.gcs, result, self.source, self.target,
-                                   **self.rounding_kwargs)
+                                   adjacency=self.adjacency(), **rounding_kwargs)
                 if rounded_edges is None:
                     print(fn.__name__, "could not find a path.")
                     active_edges.append(rounded_edges)
                 else:
                     found_path = True
                     active_edges.extend(rounded_edges)
+            if self.seed_path is not None:
+                seed_ids = [edge.id() for edge in self.seed_path]
+                if not any(path_edges is not None and [edge.id() for edge in path_edges] == seed_ids
+                           for path_edges in active_edges):
+                    active_edges.append(self.seed_path)
+                    found_path = True
             results_dict["rounded_paths"] = active_edges
             if not found_path:
                 print("All rounding strategies failed to find a path.")
+                if deadline is not None:
+                    return self.solveGreedyFallback(results_dict, "rounding", solver_options, deadline)
                 return None, None, results_dict
 
             self.options.preprocessing = False
-            rounded_results = []
+            if self.rounding_gap is None and deadline is None:
+                rounded_results = self.solveRoundedPaths(active_edges)
+                results_dict["skipped_rounded_paths"] = 0
+            else:
+                rounded_results, results_dict["skipped_rounded_paths"], out_of_time = \
+                    self.solveRoundedPathsBestFirst(active_edges, result, deadline)
+            if deadline is not None:
+                results_dict["stopped_stage"] = "rounding" if out_of_time else "complete"
             best_cost = np.inf
             best_path = None
             best_result = None
             max_rounded_solver_time = 0.0
             total_rounded_solver_time = 0.0
-            for path_edges in active_edges:
-                if path_edges is None:
-                    rounded_results.append(None)
+            for path_edges, rounded_result in zip(active_edges, rounded_results):
+                if rounded_result is None:
                     continue
-                for edge in self.gcs.Edges():
-                    if edge in path_edges:
-                        edge.AddPhiConstraint(True)
-                    else:
-                        edge.AddPhiConstraint(False)
-                rounded_results.append(self.gcs.SolveShortestPath(
-                    self.source, self.target, self.options))
-                solve_time = rounded_results[-1].get_solver_details().optimizer_time
+                solve_time = rounded_result.get_solver_details().optimizer_time
                 max_rounded_solver_time = np.maximum(solve_time, max_rounded_solver_time)
                 total_rounded_solver_time += solve_time
-                if (rounded_results[-1].is_success()
-                    and rounded_results[-1].get_optimal_cost() < best_cost):
-                    best_cost = rounded_results[-1].get_optimal_cost()
+                if (rounded_result.is_success()
+                    and rounded_result.get_optimal_cost() < best_cost):
+                    best_cost = rounded_result.get_optimal_cost()
                     best_path = path_edges
-                    best_result = rounded_results[-1]
+                    best_result = rounded_result
+
+            if best_path is None and deadline is not None:
+                return self.solveGreedyFallback(results_dict, "rounding", solver_options, deadline)
 
             results_dict["best_path"] = best_path
             results_dict["best_result"] = best_result
@@ -347,22 +1011,136 @@ class BaseGCS:
         elif rounding:
             self.options.max_rounded_paths = 10
 
+            if deadline is not None:
+                self.options.solver_options = self.budgetedSolverOptions(
+                    solver_options, deadline - time.time())
             rounded_result = self.gcs.SolveShortestPath(self.source, self.target, self.options)
-            best_path = MipPathExtraction(self.gcs, rounded_result, self.source, self.target)[0]
+            if deadline is not None:
+                if not rounded_result.is_success():
+                    return self.solveGreedyFallback(results_dict, "rounding", solver_options, deadline)
+                results_dict["stopped_stage"] = "complete"
+            best_path = MipPathExtraction(
+                self.gcs, rounded_result, self.source, self.target, self.adjacency())[0]
             best_result = rounded_result
             results_dict["best_path"] = best_path
             results_dict["best_result"] = best_result
             results_dict["rounded_results"] = [rounded_result]
             results_dict["rounded_cost"] = best_result.get_optimal_cost()
         else:
-            best_path = MipPathExtraction(self.gcs, result, self.source, self.target)[0]
+            best_path = MipPathExtraction(
+                self.gcs, result, self.source, self.target, self.adjacency())[0]
             best_result = result
             results_dict["best_path"] = best_path
             results_dict["best_result"] = best_result
             results_dict["mip_path"] = best_path
+            if deadline is not None:
+                results_dict["stopped_stage"] = "complete"
 
         if verbose:
             for edge in best_path:
                 print("Added", edge.name(), "to path.")
 
         return best_path, best_result, results_dict
+
+    # Solve many (source, target) queries on the graph as it is built. Each
+    # query gets its own endpoint vertices, which stay in the graph only for
+    # the duration of the batch; their edges carry zero flow in every other
+    # query. Relaxations and the path-restricted rounded solves of all
+    # queries run on a pool of worker threads, rounding itself runs in order
+    # so seeded strategies stay reproducible. Keyword arguments are passed to
+    # bindEndpointEdges for every query.
+    def solveBatch(self, queries, workers=None, rounding=True, preprocessing=False, **kwargs):
+        self.finalize()
+        # Phi constraints of an earlier solve would pin every query to its path.
+        if self.phi_constrained:
+            for edge in self.gcs.Edges():
+                edge.ClearPhiConstraints()
+            self.phi_constrained = False
+        start_time = time.time()
+
+        query_results = [{} for _ in queries]
+        endpoints = [None] * len(queries)
+        try:
+            for k, (source, target) in enumerate(queries):
+                try:
+                    endpoints[k] = self.connectEndpoints(source, target, **kwargs)
+                except ValueError as error:
+                    query_results[k]["error"] = str(error)
+            connected = [k for k in range(len(queries)) if endpoints[k] is not None]
+            adjacency = self.adjacency()
+
+            self.options.convex_relaxation = rounding
+            self.options.preprocessing = preprocessing
+            self.options.max_rounded_paths = 0
+
+            # Fallback positions for rounding strategies that average vertices.
+            rounding_kwargs = {"centers": self.vertexCenters(
+                [v for k in connected for v in endpoints[k][:2]]), **self.rounding_kwargs}
+
+            max_workers = 1 if workers is None else max(1, workers)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                relaxations = list(executor.map(
+                    lambda k: self.gcs.SolveShortestPath(
+                        endpoints[k][0], endpoints[k][1], self.options),
+                    connected))
+
+                candidates = {}
+                for k, result in zip(connected, relaxations):
+                    source_vertex, target_vertex = endpoints[k][:2]
+                    key = "relaxation" if rounding else "mip"
+                    query_results[k][key + "_result"] = result
+                    query_results[k][key + "_solver_time"] = \
+                        result.get_solver_details().optimizer_time
+                    query_results[k][key + "_cost"] = result.get_optimal_cost()
+                    if not result.is_success():
+                        continue
+
+                    paths = []
+                    if rounding and len(self.rounding_fn) > 0:
+                        for fn in self.rounding_fn:
+                            rounded_edges = fn(self.gcs, result, source_vertex, target_vertex,
+                                               adjacency=adjacency, **rounding_kwargs)
+                            if rounded_edges is not None:
+                                paths.extend(rounded_edges)
+                    else:
+                        paths = MipPathExtraction(
+                            self.gcs, result, source_vertex, target_vertex, adjacency)
+                    candidates[k] = [(path_edges, executor.submit(
+                        self.solveRestriction, path_edges, self.options.solver_options))
+                        for path_edges in paths]
+
+                for k, solves in candidates.items():
+                    best_path = None
+                    best_result = None
+                    rounded_results = []
+                    for path_edges, future in solves:
+                        rounded_results.append(future.result())
+                        if (rounded_results[-1].is_success() and (best_result is None
+                            or rounded_results[-1].get_optimal_cost() < best_result.get_optimal_cost())):
+                            best_path = path_edges
+                            best_result = rounded_results[-1]
+
+                    query_results[k]["rounded_results"] = rounded_results
+                    query_results[k]["best_result"] = best_result
+                    if best_result is None:
+                        continue
+                    # Edges of the endpoint vertices do not outlive the batch,
+                    # so only their names and the extracted path are kept.
+                    query_results[k]["rounded_cost"] = best_result.get_optimal_cost()
+                    query_results[k]["best_path"] = [edge.name() for edge in best_path]
+                    query_results[k]["path"] = self.extractPath(
+                        best_path, best_result, endpoints[k][1])
+        finally:
+            for k in range(len(queries)):
+                if endpoints[k] is not None:
+                    self.removeEndpoint(endpoints[k][0])
+                    self.removeEndpoint(endpoints[k][1])
+            self.graph_adjacency = None
+
+        total_time = time.time() - start_time
+        batch_stats = {"num_queries": len(queries),
+                       "total_time": total_time,
+                       "queries_per_second": len(queries) / total_time}
+        if self.restriction_cache is not None:
+            batch_stats["restriction_cache"] = self.restriction_cache.stats()
+        return query_results, batch_stats
@@ -38,7 +38,7 @@ from pydrake.trajectories import (
 from gcs.base import BaseGCS
 
 class BezierGCS(BaseGCS):
-    def __init__(self, regions, order, continuity, edges=None, hdot_min=1e-6, full_dim_overlap=False):
+    def __init__(self, regions, order, continuity, edges=None, hdot_min=1e-6, full_dim_overlap=False, overlap_workers=None, edge_cache_dir=None):
         BaseGCS.__init__(self, regions)
 
         self.order = order
@@ -49,11 +49,9 @@ class BezierGCS(BaseGCS):
                             np.eye(order, order + 1) - np.eye(order, order + 1, 1)))
         b_time = np.concatenate((1e3*np.ones(order + 1), np.zeros(order + 1), -hdot_min * np.ones(order)))
         self.time_scaling_set = HPolyhedron(A_time, b_time)
+        self.time_scaling_center = None
 
-        for i, r in enumerate(self.regions):
-            self.gcs.AddVertex(
-                r.CartesianPower(order + 1).CartesianProduct(self.time_scaling_set),
-                name = self.names[i] if not self.names is None else '')
+        self.addRegionVertices()
 
         # Formulate edge costs and constraints
         u_control = MakeMatrixContinuousVariable(
@@ -95,25 +93,71 @@ class BezierGCS(BaseGCS):
             self.contin_constraints.append(LinearEqualityConstraint(
                 DecomposeLinearExpressions(time_continuity_error, edge_vars), 0.0))
 
+        # Costs and constraints applied to every edge leaving a region. The
+        # add* methods only register terms; the first num_bound_* of each
+        # list are bound to the graph, the rest are bound by finalize().
         self.deriv_constraints = []
         self.edge_costs = []
+        self.num_bound_costs = 0
+        self.num_bound_constraints = 0
+        # Weights of the time and path length costs and the speed limit,
+        # from which lowerBoundScale is derived.
+        self.time_cost_weight = 0.
+        self.path_length_weight = 0.
+        self.max_speed = np.inf
 
         # Add edges to graph and apply costs/constraints
         if edges is None:
-            if full_dim_overlap:
-                edges = self.findEdgesViaFullDimensionOverlaps()
-            else:
-                edges = self.findEdgesViaOverlaps()
+            edges = self.findEdges(full_dim_overlap, overlap_workers, edge_cache_dir)
 
-        vertices = self.gcs.Vertices()
-        for ii, jj in edges:
-            u = vertices[ii]
-            v = vertices[jj]
-            edge = self.gcs.AddEdge(u, v, f"({u.name()}, {v.name()})")
+        self.addRegionEdges(edges)
 
-            for c_con in self.contin_constraints:
-                edge.AddConstraint(Binding[Constraint](
-                        c_con, np.append(u.x(), v.x())))
+    def makeVertex(self, region, name):
+        return super().makeVertex(
+            region.CartesianPower(self.order + 1).CartesianProduct(self.time_scaling_set),
+            name)
+
+    # All control points at the region's center, with a feasible time scaling.
+    def vertexCenter(self, center):
+        if self.time_scaling_center is None:
+            self.time_scaling_center = self.time_scaling_set.ChebyshevCenter()
+        return np.concatenate((np.tile(center, self.order + 1), self.time_scaling_center))
+
+    def makeEdge(self, u, v):
+        edge = super().makeEdge(u, v)
+
+        for c_con in self.contin_constraints:
+            edge.AddConstraint(Binding[Constraint](
+                    c_con, np.append(u.x(), v.x())))
+
+        self.bindEdgeTerms(edge)
+        return edge
+
+    # Bind the costs and constraints that were already finalized. Pending
+    # terms reach this edge with the next finalize().
+    def bindEdgeTerms(self, edge):
+        for cost in self.edge_costs[:self.num_bound_costs]:
+            edge.AddCost(Binding[Cost](cost, edge.xu()))
+        for d_con in self.deriv_constraints[:self.num_bound_constraints]:
+            edge.AddConstraint(Binding[Constraint](d_con, edge.xu()))
+
+    def finalize(self):
+        new_costs = self.edge_costs[self.num_bound_costs:]
+        new_constraints = self.deriv_constraints[self.num_bound_constraints:]
+        if len(new_costs) == 0 and len(new_constraints) == 0:
+            return
+
+        for edge in self.gcs.Edges():
+            if edge.u() == self.source:
+                continue
+            for cost in new_costs:
+                edge.AddCost(Binding[Cost](cost, edge.xu()))
+            for d_con in new_constraints:
+                edge.AddConstraint(Binding[Constraint](d_con, edge.xu()))
+
+        self.num_bound_costs = len(self.edge_costs)
+        self.num_bound_constraints = len(self.deriv_constraints)
+        self.clearRestrictionCache()
 
     def addTimeCost(self, weight):
         assert isinstance(weight, float) or isinstance(weight, int)
@@ -123,11 +167,7 @@ class BezierGCS(BaseGCS):
         time_cost = LinearCost(
             weight * DecomposeLinearExpressions(segment_time, self.u_vars)[0], 0.)
         self.edge_costs.append(time_cost)
-
-        for edge in self.gcs.Edges():
-            if edge.u() == self.source:
-                continue
-            edge.AddCost(Binding[Cost](time_cost, edge.xu()))
+        self.time_cost_weight += weight
 
     def addPathLengthCost(self, weight):
         if isinstance(weight, float) or isinstance(weight, int):
@@ -141,11 +181,8 @@ class BezierGCS(BaseGCS):
             H = DecomposeLinearExpressions(u_path_control[ii] / self.order, self.u_vars)
             path_cost = L2NormCost(np.matmul(weight_matrix, H), np.zeros(self.dimension))
             self.edge_costs.append(path_cost)
-
-            for edge in self.gcs.Edges():
-                if edge.u() == self.source:
-                    continue
-                edge.AddCost(Binding[Cost](path_cost, edge.xu()))
+        # ||W d|| >= sigma_min(W) ||d|| for any weight matrix W.
+        self.path_length_weight += np.linalg.svd(weight_matrix, compute_uv=False).min()
 
     def addPathLengthIntegralCost(self, weight, integration_points=100):
         if isinstance(weight, float) or isinstance(weight, int):
@@ -166,11 +203,6 @@ class BezierGCS(BaseGCS):
                 H = DecomposeLinearExpressions(costs, self.u_vars)
                 integral_cost = L2NormCost(np.matmul(weight_matrix, H), np.zeros(self.dimension))
                 self.edge_costs.append(integral_cost)
-
-                for edge in self.gcs.Edges():
-                    if edge.u() == self.source:
-                        continue
-                    edge.AddCost(Binding[Cost](integral_cost, edge.xu()))
         else:
             q_ds = u_path_deriv.vector_values(s_points)
             for ii in range(integration_points + 1):
@@ -184,11 +216,6 @@ class BezierGCS(BaseGCS):
                 integral_cost = L2NormCost(np.matmul(weight_matrix, H), np.zeros(self.dimension))
                 self.edge_costs.append(integral_cost)
 
-                for edge in self.gcs.Edges():
-                    if edge.u() == self.source:
-                        continue
-                    edge.AddCost(Binding[Cost](integral_cost, edge.xu()))
-
     def addPathEnergyCost(self, weight):
         if isinstance(weight, float) or isinstance(weight, int):
             weight_matrix = weight * np.eye(self.dimension)
@@ -205,11 +232,6 @@ class BezierGCS(BaseGCS):
             energy_cost = PerspectiveQuadraticCost(H, np.zeros(H.shape[0]))
             self.edge_costs.append(energy_cost)
 
-            for edge in self.gcs.Edges():
-                if edge.u() == self.source:
-                    continue
-                edge.AddCost(Binding[Cost](energy_cost, edge.xu()))
-
     def addDerivativeRegularization(self, weight_r, weight_h, order):
 
         assert isinstance(order, int) and 2 <= order <= self.order
@@ -226,11 +248,6 @@ class BezierGCS(BaseGCS):
                 reg_cost = QuadraticCost(H, np.zeros(H.shape[0]), 0)
                 self.edge_costs.append(reg_cost)
 
-                for edge in self.gcs.Edges():
-                    if edge.u() == self.source:
-                        continue
-                    edge.AddCost(Binding[Cost](reg_cost, edge.xu()))
-
     def addVelocityLimits(self, lower_bound, upper_bound):
         assert len(lower_bound) == self.dimension
         assert len(upper_bound) == self.dimension
@@ -247,15 +264,19 @@ class BezierGCS(BaseGCS):
             velocity_con = LinearConstraint(
                 A_constraint, -np.inf*np.ones(2*self.dimension), np.zeros(2*self.dimension))
             self.deriv_constraints.append(velocity_con)
+        self.max_speed = min(self.max_speed, np.linalg.norm(
+            np.maximum(np.abs(lower_bound), np.abs(upper_bound))))
 
-            for edge in self.gcs.Edges():
-                if edge.u() == self.source:
-                    continue
-                edge.AddConstraint(Binding[Constraint](velocity_con, edge.xu()))
+    # The path length bounds the length cost directly and, with a speed
+    # limit, the duration of the trajectory.
+    def lowerBoundScale(self):
+        return self.path_length_weight + self.time_cost_weight / self.max_speed
 
     def addSourceTarget(self, source, target, edges=None, velocity=None, zero_deriv_boundary=None):
-        source_edges, target_edges =  super().addSourceTarget(source, target, edges)
+        return super().addSourceTarget(source, target, edges, velocity=velocity,
+                                       zero_deriv_boundary=zero_deriv_boundary)
 
+    def bindEndpointEdges(self, source_edges, target_edges, velocity=None, zero_deriv_boundary=None):
         if velocity is not None:
             assert velocity.shape == (2, self.dimension)
 
@@ -307,26 +328,24 @@ class BezierGCS(BaseGCS):
                 for f_con in final_constraints:
                     edge.AddConstraint(Binding[Constraint](f_con, edge.xu()))
 
-            for cost in self.edge_costs:
-                edge.AddCost(Binding[Cost](cost, edge.xu()))
-
-            for d_con in self.deriv_constraints:
-                edge.AddConstraint(Binding[Constraint](d_con, edge.xu()))
-
+            self.bindEdgeTerms(edge)
 
-    def SolvePath(self, rounding=False, verbose=False, preprocessing=False):
+    def SolvePath(self, rounding=False, verbose=False, preprocessing=False, time_budget=None):
         best_path, best_result, results_dict = self.solveGCS(
-            rounding, preprocessing, verbose)
+            rounding, preprocessing, verbose, time_budget)
 
         if best_path is None:
             return None, results_dict, None
 
+        return self.extractPath(best_path, best_result, self.target), results_dict, best_path
+
+    def extractPath(self, best_path, best_result, target):
         # Extract trajectory control points
         knots = np.zeros(self.order + 1)
         path_control_points = []
         time_control_points = []
         for edge in best_path:
-            if edge.v() == self.target:
+            if edge.v() == target:
                 knots = np.concatenate((knots, [knots[-1]]))
                 path_control_points.append(best_result.GetSolution(edge.xv()))
                 time_control_points.append(np.array([best_result.GetSolution(edge.xu())[-1]]))
@@ -350,7 +369,7 @@ class BezierGCS(BaseGCS):
         path = BsplineTrajectory(BsplineBasis(self.order + 1, knots), path_control_points)
         time_traj = BsplineTrajectory(BsplineBasis(self.order + 1, knots), time_control_points)
 
-        return BezierTrajectory(path, time_traj), results_dict, best_path
+        return BezierTrajectory(path, time_traj)
 
 class BezierTrajectory:
     def __init__(self, path_traj, time_traj):
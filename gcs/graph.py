@@ -0,0 +1,58 @@
+import numpy as np
+
+# Directed graph over vertices 0..num_vertices-1 with edge k going from
+# tails[k] to heads[k]. Edges are stored in CSR form twice, grouped by tail
+# (outgoing) and by head (incoming), as edge indices. Within a vertex, edges
+# keep their original order.
+class IndexGraph:
+    def __init__(self, num_vertices, tails, heads):
+        self.num_vertices = num_vertices
+        self.tails = np.asarray(tails, dtype=int)
+        self.heads = np.asarray(heads, dtype=int)
+
+        self.out_edges = np.argsort(self.tails, kind="stable")
+        self.out_offsets = np.concatenate(
+            ([0], np.cumsum(np.bincount(self.tails, minlength=num_vertices))))
+        self.in_edges = np.argsort(self.heads, kind="stable")
+        self.in_offsets = np.concatenate(
+            ([0], np.cumsum(np.bincount(self.heads, minlength=num_vertices))))
+
+    def outgoingIndices(self, i):
+        return self.out_edges[self.out_offsets[i]:self.out_offsets[i + 1]]
+
+    def incomingIndices(self, i):
+        return self.in_edges[self.in_offsets[i]:self.in_offsets[i + 1]]
+
+# Snapshot of the connectivity of a GraphOfConvexSets, with the indices of
+# its vertices and edges in self.vertices and self.edges. The snapshot must
+# be rebuilt whenever the graph changes; BaseGCS takes care of that for the
+# graph it owns.
+class GraphAdjacency(IndexGraph):
+    def __init__(self, gcs):
+        self.vertices = gcs.Vertices()
+        self.edges = gcs.Edges()
+        self.vertex_index = {v.id(): i for i, v in enumerate(self.vertices)}
+        self.edge_index = {e.id(): k for k, e in enumerate(self.edges)}
+
+        IndexGraph.__init__(
+            self, len(self.vertices),
+            np.array([self.vertex_index[e.u().id()] for e in self.edges], dtype=int),
+            np.array([self.vertex_index[e.v().id()] for e in self.edges], dtype=int))
+
+        self.edge_map = {}
+        for k, (i, j) in enumerate(zip(self.tails, self.heads)):
+            self.edge_map.setdefault((int(i), int(j)), k)
+
+    def index(self, v):
+        return self.vertex_index[v.id()]
+
+    def outgoing(self, v):
+        return [self.edges[k] for k in self.outgoingIndices(self.index(v))]
+
+    def incoming(self, v):
+        return [self.edges[k] for k in self.incomingIndices(self.index(v))]
+
+    # First edge from u to v, or None if the vertices are not adjacent.
+    def edge(self, u, v):
+        k = self.edge_map.get((self.index(u), self.index(v)))
+        return None if k is None else self.edges[k]
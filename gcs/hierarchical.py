@@ -0,0 +1,137 @@
+import time
+
+import numpy as np
+from pydrake.geometry.optimization import HPolyhedron
+
+from gcs.linear import LinearGCS
+from gcs.regions import RegionStore
+
+# Two level planner for regions laid out on a regular grid, such as the cells
+# of models.maze.Maze or of building_generation.generate_grid_world. Regions
+# are grouped into blocks of block_size (in world units) by their bounding
+# box centers, and every block becomes one box shaped super-region whose
+# edges are the fine edges crossing between blocks. A coarse LinearGCS over
+# the blocks picks a corridor, and the fine problem is only built over the
+# regions of the blocks within halo hops of it. Walls inside a block are
+# invisible to the coarse problem, so if the corridor holds no fine path the
+# halo is grown and, as a last resort, the full graph is solved.
+#
+# gcs_factory(regions, edges) builds the fine problem (e.g. a BezierGCS with
+# its costs and solver); it is called once per attempt.
+class HierarchicalGCS:
+    def __init__(self, regions, edges, block_size, gcs_factory=LinearGCS, coarse_solver=None):
+        self.regions = list(regions)
+        self.edges = [(int(ii), int(jj)) for ii, jj in edges]
+        self.gcs_factory = gcs_factory
+
+        lower, upper = RegionStore(self.regions).boundingBoxes()
+        assert np.all(np.isfinite(lower)) and np.all(np.isfinite(upper))
+        keys = np.floor((0.5 * (lower + upper) - lower.min(axis=0)) / block_size).astype(int)
+        _, self.block_of = np.unique(keys, axis=0, return_inverse=True)
+        self.block_of = self.block_of.ravel()
+        num_blocks = np.max(self.block_of) + 1
+
+        block_lower = np.full((num_blocks, lower.shape[1]), np.inf)
+        block_upper = np.full((num_blocks, lower.shape[1]), -np.inf)
+        np.minimum.at(block_lower, self.block_of, lower)
+        np.maximum.at(block_upper, self.block_of, upper)
+        self.coarse_regions = [HPolyhedron.MakeBox(l, u)
+                               for l, u in zip(block_lower, block_upper)]
+
+        coarse_edges = set()
+        for ii, jj in self.edges:
+            if self.block_of[ii] != self.block_of[jj]:
+                coarse_edges.add((int(self.block_of[ii]), int(self.block_of[jj])))
+        self.coarse_edges = sorted(coarse_edges)
+        self.block_neighbors = [set() for _ in range(num_blocks)]
+        for bi, bj in self.coarse_edges:
+            self.block_neighbors[bi].add(bj)
+            self.block_neighbors[bj].add(bi)
+
+        self.coarse_gcs = LinearGCS(self.coarse_regions, self.coarse_edges)
+        if coarse_solver is not None:
+            self.coarse_gcs.setSolver(coarse_solver)
+
+    def solveCoarse(self, source, target, rounding, preprocessing):
+        self.coarse_gcs.addSourceTarget(source, target)
+        _, _, results_dict, best_path = self.coarse_gcs.SolvePath(
+            rounding, False, preprocessing)
+        if best_path is None:
+            return None, results_dict
+        block_index = {v.id(): ii for ii, v in enumerate(self.coarse_gcs.region_vertices)}
+        blocks = [block_index[e.v().id()] for e in best_path if e.v().id() in block_index]
+        return blocks, results_dict
+
+    def blockNeighborhood(self, blocks, halo):
+        inside = set(blocks)
+        frontier = set(blocks)
+        for _ in range(halo):
+            frontier = set().union(*[self.block_neighbors[b] for b in frontier]) - inside
+            inside |= frontier
+        return inside
+
+    def buildFine(self, cells):
+        index = -np.ones(len(self.regions), dtype=int)
+        index[cells] = np.arange(len(cells))
+        edges = [(index[ii], index[jj]) for ii, jj in self.edges
+                 if index[ii] >= 0 and index[jj] >= 0]
+        return self.gcs_factory([self.regions[ii] for ii in cells], edges)
+
+    def solveFine(self, cells, source, target, rounding, preprocessing, endpoint_kwargs):
+        gcs = self.buildFine(cells)
+        try:
+            gcs.addSourceTarget(source, target, **endpoint_kwargs)
+        except ValueError:
+            return None
+        return gcs.SolvePath(rounding, False, preprocessing)
+
+    # Returns the output of the fine problem's SolvePath. Its results_dict
+    # gains a "hierarchy" entry with the timing of both levels and, with
+    # compare_flat=True, the cost gap to solving the full graph at once.
+    def SolvePath(self, source, target, rounding=True, preprocessing=False,
+                  halo=1, max_halo=None, compare_flat=False, **endpoint_kwargs):
+        if max_halo is None:
+            max_halo = halo + 2
+        start_time = time.time()
+        blocks, coarse_results = self.solveCoarse(source, target, rounding, preprocessing)
+        stats = {"coarse_time": time.time() - start_time,
+                 "coarse_cost": pathCost(coarse_results),
+                 "coarse_blocks": None if blocks is None else len(blocks)}
+
+        fine_start_time = time.time()
+        attempts = [] if blocks is None else list(range(halo, max_halo + 1))
+        solution = None
+        for h in attempts + [None]:
+            if h is None:
+                cells = np.arange(len(self.regions))
+            else:
+                neighborhood = list(self.blockNeighborhood(blocks, h))
+                cells = np.flatnonzero(np.isin(self.block_of, neighborhood))
+            solution = self.solveFine(cells, source, target, rounding,
+                                      preprocessing, endpoint_kwargs)
+            if solution is not None and solution[-1] is not None:
+                break
+
+        stats["fine_time"] = time.time() - fine_start_time
+        stats["total_time"] = time.time() - start_time
+        stats["halo"] = h
+        stats["fine_regions"] = len(cells)
+        stats["region_fraction"] = len(cells) / len(self.regions)
+        if solution is None:
+            return solution
+
+        results_dict = solution[-2]
+        stats["cost"] = pathCost(results_dict)
+        if compare_flat:
+            flat_start_time = time.time()
+            flat_solution = self.solveFine(np.arange(len(self.regions)), source, target,
+                                           rounding, preprocessing, endpoint_kwargs)
+            stats["flat_time"] = time.time() - flat_start_time
+            stats["flat_cost"] = None if flat_solution is None else pathCost(flat_solution[-2])
+            if stats["cost"] is not None and stats["flat_cost"] is not None:
+                stats["cost_gap"] = (stats["cost"] - stats["flat_cost"]) / np.abs(stats["flat_cost"])
+        results_dict["hierarchy"] = stats
+        return solution
+
+def pathCost(results_dict):
+    return results_dict.get("rounded_cost", results_dict.get("mip_cost"))
@@ -16,7 +16,7 @@ from pydrake.solvers import (
 from gcs.base import BaseGCS
 
 class LinearGCS(BaseGCS):
-    def __init__(self, regions, edges=None, path_weights=None, full_dim_overlap=False):
+    def __init__(self, regions, edges=None, path_weights=None, full_dim_overlap=False, overlap_workers=None, edge_cache_dir=None):
         BaseGCS.__init__(self, regions)
 
         if path_weights is None:
@@ -25,45 +25,52 @@ class LinearGCS(BaseGCS):
             path_weights = path_weights * np.ones(self.dimension)
         assert len(path_weights) == self.dimension
 
+        self.path_weights = np.asarray(path_weights, dtype=float)
         self.edge_cost = L2NormCost(
             np.hstack((np.diag(-path_weights), np.diag(path_weights))),
             np.zeros(self.dimension))
 
-        for i, r in enumerate(self.regions):
-            vertex = self.gcs.AddVertex(r, name = self.names[i] if not self.names is None else '')
-            # print('added vertex with id: ', vertex.id().get_value())
+        # One containment constraint per vertex, shared by all its out edges.
+        self.vertex_constraints = {}
 
+        self.addRegionVertices()
 
         if edges is None:
-            if full_dim_overlap:
-                edges = self.findEdgesViaFullDimensionOverlaps()
-            else:
-                edges = self.findEdgesViaOverlaps()
+            edges = self.findEdges(full_dim_overlap, overlap_workers, edge_cache_dir)
+        elif len(edges) == 0:
+            raise ValueError('edges is empty; pass None to find edges from region overlaps.')
         else:
-            vertices = self.gcs.Vertices()
             target_idx = edges[-1][1]
-            self.target = vertices[target_idx]
+            self.target = self.region_vertices[target_idx]
 
+        self.addRegionEdges(edges)
 
-        vertices = self.gcs.Vertices()
-        for ii, jj in edges:
-            u = vertices[ii]
-            v = vertices[jj]
-            edge = self.gcs.AddEdge(u, v, f"({u.name()}, {v.name()})")
+    def lowerBoundScale(self):
+        return np.min(np.abs(self.path_weights))
+
+    def vertexConstraint(self, u):
+        if u.id() not in self.vertex_constraints:
+            A = u.set().A()
+            b = u.set().b()
+            self.vertex_constraints[u.id()] = LinearConstraint(
+                A, -np.inf*np.ones(len(b)), b)
+        return self.vertex_constraints[u.id()]
 
-            edge_length = edge.AddCost(Binding[Cost](
-                self.edge_cost, np.append(u.x(), v.x())))[1]
+    def makeEdge(self, u, v):
+        edge = super().makeEdge(u, v)
 
-            # Constrain point in v to be in u
-            edge.AddConstraint(Binding[Constraint](
-                LinearConstraint(u.set().A(),
-                                 -np.inf*np.ones(len(u.set().b())),
-                                 u.set().b()),
-                v.x()))
+        edge_length = edge.AddCost(Binding[Cost](
+            self.edge_cost, np.append(u.x(), v.x())))[1]
 
-    def addSourceTarget(self, source, target, edges=None):
-        source_edges, target_edges = super().addSourceTarget(source, target, edges)
+        # Constrain point in v to be in u
+        edge.AddConstraint(Binding[Constraint](self.vertexConstraint(u), v.x()))
+        return edge
 
+    def removeRegion(self, ii):
+        self.vertex_constraints.pop(self.region_vertices[ii].id(), None)
+        super().removeRegion(ii)
+
+    def bindEndpointEdges(self, source_edges, target_edges):
         for edge in source_edges:
             for jj in range(self.dimension):
                 edge.AddConstraint(edge.xu()[jj] == edge.xv()[jj])
@@ -74,17 +81,11 @@ class LinearGCS(BaseGCS):
 
     def addSource(self, source):
         source_edges = super().addSource(source)
-
-        for edge in source_edges:
-            for jj in range(self.dimension):
-                edge.AddConstraint(edge.xu()[jj] == edge.xv()[jj])
+        self.bindEndpointEdges(source_edges, [])
 
     def addTarget(self, target):
         target_edges = super().addTarget(target)
-
-        for edge in target_edges:
-            edge.AddCost(Binding[Cost](
-                self.edge_cost, np.append(edge.xu(), edge.xv())))
+        self.bindEndpointEdges([], target_edges)
 
     def getVertex(self, cset):
         vertices = self.gcs.Vertices()
@@ -93,13 +94,17 @@ class LinearGCS(BaseGCS):
                 return v
         return None
 
-    def SolvePath(self, rounding=False, verbose=False, preprocessing=False):
+    def SolvePath(self, rounding=False, verbose=False, preprocessing=False, time_budget=None):
         best_path, best_result, results_dict = self.solveGCS(
-            rounding, preprocessing, verbose)
+            rounding, preprocessing, verbose, time_budget)
 
         if best_path is None:
             return None, best_result, results_dict, None
 
+        waypoints = self.extractPath(best_path, best_result, self.target)
+        return waypoints, best_result, results_dict, best_path
+
+    def extractPath(self, best_path, best_result, target):
         # Extract trajectory
         waypoints = np.empty((self.dimension, 0))
         for edge in best_path:
@@ -107,4 +112,4 @@ class LinearGCS(BaseGCS):
             waypoints = np.concatenate(
                 [waypoints, np.expand_dims(new_waypoint, 1)], axis=1)
 
-        return waypoints, best_result, results_dict, best_path
+        return waypoints
@@ -0,0 +1,194 @@
+import hashlib
+
+import numpy as np
+from pydrake.solvers import MathematicalProgram, Solve
+
+from gcs import util
+from gcs.graph import IndexGraph
+from gcs.regions import RegionStore
+from gcs.spatial import boundingBox
+from gcs.surrogate import dijkstra
+
+# Lower bound graph (LBG) of a region graph. In a path through regions
+# u -> v -> w, the point where the path passes from u into v lies in the
+# intersection I_uv of both regions (LinearGCS constrains the waypoint of v
+# to u, BezierGCS joins the control points of consecutive segments), and the
+# length of the path inside v is at least the distance between I_uv and I_vw.
+# The nodes of the LBG are the region edges, and LBG edges join (u, v) to
+# (v, w) with that set-to-set distance. The LBG only depends on the regions
+# and edges, so it is cached on disk; bounds for a given source or target
+# follow from one Dijkstra search.
+#
+# All bounds are distances. Costs that are at least scale times the length
+# of the path (see BaseGCS.lowerBoundScale) are bounded by scale times them.
+
+def isBox(A):
+    return np.all(np.sum(A != 0, axis=1) == 1)
+
+def boxDistances(lower1, upper1, lower2, upper2):
+    gap = np.maximum(np.maximum(lower2 - upper1, lower1 - upper2), 0.)
+    return np.linalg.norm(gap, axis=-1)
+
+# Minimum distance between the polytopes A1 x <= b1 and A2 y <= b2, or inf if
+# either is empty.
+def setDistance(A1, b1, A2, b2):
+    n = A1.shape[1]
+    prog = MathematicalProgram()
+    x = prog.NewContinuousVariables(n, "x")
+    y = prog.NewContinuousVariables(n, "y")
+    prog.AddLinearConstraint(A1, -np.inf * np.ones(len(b1)), b1, x)
+    prog.AddLinearConstraint(A2, -np.inf * np.ones(len(b2)), b2, y)
+    D = np.hstack((np.eye(n), -np.eye(n)))
+    prog.AddQuadraticCost(2 * D.T.dot(D), np.zeros(2 * n), np.concatenate((x, y)))
+    result = Solve(prog)
+    if not result.is_success():
+        return np.inf
+    return np.linalg.norm(result.GetSolution(x) - result.GetSolution(y))
+
+def pointPolytope(x):
+    n = len(x)
+    return np.vstack((np.eye(n), -np.eye(n))), np.concatenate((x, -x))
+
+class LowerBoundGraph:
+    def __init__(self, regions, edges, cache_dir=None):
+        self.region_store = RegionStore(list(regions))
+        self.edges = np.array(edges, dtype=int).reshape(-1, 2)
+        store = self.region_store
+        tails, heads = self.edges[:, 0], self.edges[:, 1]
+        self.region_graph = IndexGraph(len(store), tails, heads)
+
+        # Intersections of the regions of every edge; those of two boxes are
+        # boxes themselves.
+        region_boxes = np.array([isBox(store.A(ii)) for ii in range(len(store))], dtype=bool)
+        lower, upper = np.full((2, len(store), store.dimension), np.nan)
+        for ii in np.flatnonzero(region_boxes):
+            lower[ii], upper[ii] = boundingBox(store.A(ii), store.b(ii))
+        self.region_boxes = region_boxes
+        self.region_lower = lower
+        self.region_upper = upper
+        self.node_boxes = region_boxes[tails] & region_boxes[heads]
+        self.node_lower = np.maximum(lower[tails], lower[heads])
+        self.node_upper = np.minimum(upper[tails], upper[heads])
+
+        # LBG edges (k, k2) continue edge k = (u, v) with k2 = (v, w), w != u.
+        pairs = [(k, k2) for k, (u, v) in enumerate(self.edges)
+                 for k2 in self.region_graph.outgoingIndices(v) if heads[k2] != u]
+        self.pairs = np.array(pairs, dtype=int).reshape(-1, 2)
+
+        if cache_dir is None:
+            cache_dir = util.EdgeCacheDir()
+        key = None
+        if cache_dir is not None:
+            edges_digest = hashlib.sha256(np.ascontiguousarray(self.edges).tobytes()).hexdigest()
+            key = util.EdgeCacheKey(store, "lbg:" + edges_digest)
+            cached = util.LoadCachedArrays(cache_dir, key)
+            if cached is not None and np.array_equal(cached["pairs"], self.pairs):
+                self.distances = cached["distances"]
+                return
+
+        self.distances = self.pairDistances()
+        if key is not None:
+            util.SaveCachedArrays(cache_dir, key, pairs=self.pairs, distances=self.distances)
+
+    def nodePolytope(self, k):
+        u, v = self.edges[k]
+        store = self.region_store
+        return (np.vstack((store.A(u), store.A(v))),
+                np.concatenate((store.b(u), store.b(v))))
+
+    def pairDistances(self):
+        first, second = self.pairs[:, 0], self.pairs[:, 1]
+        distances = np.empty(len(self.pairs))
+        boxes = self.node_boxes[first] & self.node_boxes[second]
+        distances[boxes] = boxDistances(
+            self.node_lower[first[boxes]], self.node_upper[first[boxes]],
+            self.node_lower[second[boxes]], self.node_upper[second[boxes]])
+        for p in np.flatnonzero(~boxes):
+            distances[p] = setDistance(*self.nodePolytope(first[p]),
+                                       *self.nodePolytope(second[p]))
+        return distances
+
+    def pointDistances(self, x, nodes):
+        distances = np.empty(len(nodes))
+        for n, k in enumerate(nodes):
+            if self.node_boxes[k]:
+                distances[n] = boxDistances(self.node_lower[k], self.node_upper[k], x, x)
+            else:
+                distances[n] = setDistance(*self.nodePolytope(k), *pointPolytope(x))
+        return distances
+
+    # Straight line distances from x to the intersections of the edges and to
+    # the regions. Only computed for boxes; zero, and still a lower bound,
+    # for all other sets.
+    def straightLineBounds(self, x):
+        with np.errstate(invalid="ignore"):
+            node_distances = boxDistances(self.node_lower, self.node_upper, x, x)
+            region_distances = boxDistances(self.region_lower, self.region_upper, x, x)
+        return (np.where(self.node_boxes, node_distances, 0.),
+                np.where(self.region_boxes, region_distances, 0.))
+
+    # Lower bounds on the path length from the point where a path enters
+    # region v through edge k = (u, v) to the target (edge_bounds[k]), and
+    # from any point of region v to the target (vertex_bounds[v]).
+    def costToGo(self, target):
+        target = np.asarray(target, dtype=float)
+        tails, heads = self.edges[:, 0], self.edges[:, 1]
+        target_regions = self.region_store.contains(target)
+        terminal = np.flatnonzero(target_regions[heads])
+        edge_bounds = self.searchFromPoint(target, terminal, reverse=True)
+
+        vertex_bounds = np.full(len(self.region_store), np.inf)
+        np.minimum.at(vertex_bounds, tails, edge_bounds)
+        vertex_bounds[target_regions] = 0.
+        # Turns between touching intersections are free in the LBG, so the
+        # straight line distance to the target is often the tighter bound.
+        node_distances, region_distances = self.straightLineBounds(target)
+        return np.maximum(vertex_bounds, region_distances), \
+            np.maximum(edge_bounds, node_distances)
+
+    # Lower bounds on the path length from the source to the point where a
+    # path enters region v through edge k = (u, v) (edge_bounds[k]), and to
+    # any point of region v (vertex_bounds[v]).
+    def costFromSource(self, source):
+        source = np.asarray(source, dtype=float)
+        tails, heads = self.edges[:, 0], self.edges[:, 1]
+        source_regions = self.region_store.contains(source)
+        initial = np.flatnonzero(source_regions[tails])
+        edge_bounds = self.searchFromPoint(source, initial, reverse=False)
+
+        vertex_bounds = np.full(len(self.region_store), np.inf)
+        np.minimum.at(vertex_bounds, heads, edge_bounds)
+        vertex_bounds[source_regions] = 0.
+        node_distances, region_distances = self.straightLineBounds(source)
+        return np.maximum(vertex_bounds, region_distances), \
+            np.maximum(edge_bounds, node_distances)
+
+    # Dijkstra over the LBG from an extra node at the point x, joined to the
+    # given LBG nodes by their distance to x.
+    def searchFromPoint(self, x, nodes, reverse):
+        num_nodes = len(self.edges)
+        point_edges = np.column_stack((np.full(len(nodes), num_nodes), nodes))
+        if reverse:
+            point_edges = point_edges[:, ::-1]
+        graph_edges = np.vstack((self.pairs, point_edges))
+        graph = IndexGraph(num_nodes + 1, graph_edges[:, 0], graph_edges[:, 1])
+        weights = np.concatenate((self.distances, self.pointDistances(x, nodes)))
+        distances, _ = dijkstra(graph, weights, num_nodes, reverse=reverse)
+        return distances[:num_nodes]
+
+    # Lower bounds on the length of any source-target path through each edge
+    # (edge_bounds[k]) and each region (vertex_bounds[v]).
+    def pathBounds(self, source, target):
+        source = np.asarray(source, dtype=float)
+        target = np.asarray(target, dtype=float)
+        _, to_go = self.costToGo(target)
+        _, from_source = self.costFromSource(source)
+        distance = np.linalg.norm(target - source)
+        edge_bounds = np.maximum(from_source + to_go, distance)
+        vertex_bounds = np.full(len(self.region_store), np.inf)
+        np.minimum.at(vertex_bounds, self.edges[:, 1], edge_bounds)
+        np.minimum.at(vertex_bounds, self.edges[:, 0], edge_bounds)
+        # A path may also start and end in the same region.
+        both = self.region_store.contains(source) & self.region_store.contains(target)
+        vertex_bounds[both] = distance
+        return vertex_bounds, edge_bounds
@@ -1,28 +1,184 @@
 import numpy as np
+from collections import deque
 from pydrake.all import MathematicalProgram, Solve
 from time import time
 
-def removeRedundancies(gcs, s, t, tol=1e-4, verbose=False):
+from gcs.graph import GraphAdjacency
+
+# Boolean mask of the vertices reachable from start (or, with reverse=True,
+# that reach start) without passing through stop.
+def reachableVertices(adjacency, start, stop, reverse=False):
+    edge_indices = adjacency.incomingIndices if reverse else adjacency.outgoingIndices
+    neighbors = adjacency.tails if reverse else adjacency.heads
+    reached = np.zeros(len(adjacency.vertices), dtype=bool)
+    reached[start] = True
+    queue = deque([start])
+    while queue:
+        i = queue.popleft()
+        if i == stop:
+            continue
+        for k in edge_indices(i):
+            j = neighbors[k]
+            if not reached[j]:
+                reached[j] = True
+                queue.append(j)
+    return reached
+
+# Entry and exit times of every vertex in the dominator tree of the graph
+# restricted to the edges in live_edges, rooted at root (iterative algorithm
+# of Cooper, Harvey and Kennedy). Vertex a dominates b iff
+# enter[a] <= enter[b] and leave[b] <= leave[a]; unreachable vertices get -1.
+def dominatorIntervals(adjacency, root, live_edges, reverse=False):
+    num_vertices = len(adjacency.vertices)
+    out_indices = adjacency.incomingIndices if reverse else adjacency.outgoingIndices
+    in_indices = adjacency.outgoingIndices if reverse else adjacency.incomingIndices
+    heads = adjacency.tails if reverse else adjacency.heads
+    tails = adjacency.heads if reverse else adjacency.tails
+
+    # Postorder of a depth first search from the root.
+    postorder = np.full(num_vertices, -1)
+    order = []
+    visited = np.zeros(num_vertices, dtype=bool)
+    visited[root] = True
+    stack = [(root, iter(out_indices(root)))]
+    while stack:
+        i, children = stack[-1]
+        for k in children:
+            j = heads[k]
+            if live_edges[k] and not visited[j]:
+                visited[j] = True
+                stack.append((j, iter(out_indices(j))))
+                break
+        else:
+            stack.pop()
+            postorder[i] = len(order)
+            order.append(i)
+
+    idom = np.full(num_vertices, -1)
+    idom[root] = root
+    changed = True
+    while changed:
+        changed = False
+        for i in reversed(order[:-1]):
+            new_idom = -1
+            for k in in_indices(i):
+                p = tails[k]
+                if not live_edges[k] or idom[p] < 0:
+                    continue
+                if new_idom < 0:
+                    new_idom = p
+                    continue
+                a, b = p, new_idom
+                while a != b:
+                    while postorder[a] < postorder[b]:
+                        a = idom[a]
+                    while postorder[b] < postorder[a]:
+                        b = idom[b]
+                new_idom = a
+            if idom[i] != new_idom:
+                idom[i] = new_idom
+                changed = True
+
+    children = [[] for _ in range(num_vertices)]
+    for i in order[:-1]:
+        children[idom[i]].append(i)
+    enter = np.full(num_vertices, -1)
+    leave = np.full(num_vertices, -1)
+    clock = 0
+    stack = [(root, iter(children[root]))]
+    enter[root] = clock
+    while stack:
+        i, remaining = stack[-1]
+        j = next(remaining, None)
+        clock += 1
+        if j is None:
+            leave[i] = clock
+            stack.pop()
+        else:
+            enter[j] = clock
+            stack.append((j, iter(children[j])))
+    return enter, leave
+
+# Boolean mask of the edges that cannot lie on a simple s-t path: edges not
+# reachable from s or not reaching t, and edges (u, v) where every s-u path
+# already visits v or every v-t path already visits u. Removing such edges
+# can cut further vertices off, so both tests are repeated until nothing
+# changes.
+def deadEdges(adjacency, s, t):
+    si = adjacency.index(s)
+    ti = adjacency.index(t)
+    forward = reachableVertices(adjacency, si, ti)
+    backward = reachableVertices(adjacency, ti, si, reverse=True)
+    tails = adjacency.tails
+    heads = adjacency.heads
+    live = forward[tails] & backward[heads] & (tails != ti) & (heads != si)
+
+    num_live = -1
+    while num_live != np.sum(live):
+        num_live = np.sum(live)
+        enter, leave = dominatorIntervals(adjacency, si, live)
+        live &= (enter[tails] >= 0) & (enter[heads] >= 0)
+        live &= ~((enter[heads] <= enter[tails]) & (leave[tails] <= leave[heads]))
+        enter, leave = dominatorIntervals(adjacency, ti, live, reverse=True)
+        live &= (enter[tails] >= 0) & (enter[heads] >= 0)
+        live &= ~((enter[tails] <= enter[heads]) & (leave[heads] <= leave[tails]))
+    return ~live
+
+# Turns off the edges found by deadEdges. Vertices other than s and t left
+# without edges are reported as removed.
+def pruneUnreachable(gcs, s, t, verbose=False, adjacency=None):
+    if adjacency is None:
+        adjacency = GraphAdjacency(gcs)
+    start_time = time()
+
+    dead = deadEdges(adjacency, s, t)
+    for k in np.flatnonzero(dead):
+        adjacency.edges[k].AddPhiConstraint(False)
+
+    num_vertices = len(adjacency.vertices)
+    live_vertices = np.zeros(num_vertices, dtype=bool)
+    live_vertices[adjacency.tails[~dead]] = True
+    live_vertices[adjacency.heads[~dead]] = True
+    live_vertices[[adjacency.index(s), adjacency.index(t)]] = True
+
+    pruning_stats = {'total': time() - start_time,
+                     'edges': len(dead),
+                     'removed_edges': int(np.sum(dead)),
+                     'vertices': num_vertices,
+                     'removed_vertices': int(num_vertices - np.sum(live_vertices))}
+    if verbose:
+        print('Pruned', pruning_stats['removed_edges'], 'of', pruning_stats['edges'],
+              'edges and', pruning_stats['removed_vertices'], 'of',
+              pruning_stats['vertices'], 'vertices in', pruning_stats['total'], 's')
+    return pruning_stats
+
+def removeRedundancies(gcs, s, t, tol=1e-4, verbose=False, adjacency=None):
+
+    if adjacency is None:
+        adjacency = GraphAdjacency(gcs)
+    edges = adjacency.edges
+    vertices = adjacency.vertices
 
     # Store time necessary to run the function and to solve the optimizations.
     preprocessing_times = {'total': time(), 'linear_programs': 0}
 
     if verbose:
-        print('Edges before preprocessing:', len(gcs.Edges()))
+        print('Edges before preprocessing:', len(edges))
 
     # Edges incident with each vertex.
-    inedges_w = lambda w: [k for k, e in enumerate(gcs.Edges()) if e.v() == w]
-    outedges_w = lambda w: [k for k, e in enumerate(gcs.Edges()) if e.u() == w]
+    inedges_w = lambda w: list(adjacency.incomingIndices(adjacency.index(w)))
+    outedges_w = lambda w: list(adjacency.outgoingIndices(adjacency.index(w)))
 
     # Ensure that s and t have no incoming and outgoing edges, respectively.
+    removal_indices = set(inedges_w(s) + outedges_w(t))
     removal_edges = []
-    for k in inedges_w(s) + outedges_w(t):
-        removal_edges.append(gcs.Edges()[k])
+    for k in removal_indices:
+        removal_edges.append(edges[k])
     for e in removal_edges:
         e.AddPhiConstraint(False)
 
     # Flow from s to u.
-    nE = len(gcs.Edges())
+    nE = len(edges)
     zeroE = np.zeros(nE)
     onesE = np.ones(nE)
     prog = MathematicalProgram()
@@ -34,12 +190,12 @@ def removeRedundancies(gcs, s, t, tol=1e-4, verbose=False):
     g_limits = prog.AddBoundingBoxConstraint(zeroE, onesE, g).evaluator()
 
     # Containers for the constraints.
-    nV = len(gcs.Vertices())
+    nV = len(vertices)
     conservation_f = [None] * nV
     conservation_g = [None] * nV
     degree = [None] * nV
 
-    for i, w in enumerate(gcs.Vertices()):
+    for i, w in enumerate(vertices):
     
         # Conservation of flow for f.
         Ew_in = inedges_w(w)
@@ -65,11 +221,19 @@ def removeRedundancies(gcs, s, t, tol=1e-4, verbose=False):
             fgin = np.concatenate((f[Ew_in], g[Ew_in]))
             degree[i] = prog.AddLinearConstraint(A, [0], [1], fgin).evaluator()
 
+    # Edges ruled out by graph search alone need no linear program.
+    dead = deadEdges(adjacency, s, t)
+
     redundant_edges = []
-    for e in gcs.Edges():
+    for k, e in enumerate(edges):
+
+        if dead[k]:
+            if not k in removal_indices:
+                redundant_edges.append(e)
+            continue
 
-        i = gcs.Vertices().index(e.u())
-        j = gcs.Vertices().index(e.v())
+        i = adjacency.tails[k]
+        j = adjacency.heads[k]
 
         # Update bounds of consevation of flow.
         if s == e.u():
@@ -111,7 +275,7 @@ def removeRedundancies(gcs, s, t, tol=1e-4, verbose=False):
 
     preprocessing_times['total'] = time() - preprocessing_times['total']
     if verbose:
-        print('Edges after preprocessing:', len(gcs.Edges()) - len(redundant_edges) - len(removal_edges))
+        print('Edges after preprocessing:', len(edges) - len(redundant_edges) - len(removal_edges))
         print('Total time for preprocessing:', preprocessing_times['total'])
         print('Time spent solving linear programs:', preprocessing_times['linear_programs'])
 
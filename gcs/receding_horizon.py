@@ -0,0 +1,106 @@
+import time
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from gcs.linear import LinearGCS
+from gcs.regions import RegionStore
+
+# Receding horizon planner for long traversals. Every step only builds a
+# GCS over the regions within horizon hops of the current position, so the
+# cost of a step depends on the horizon and not on the size of the map. When
+# the goal is outside of the window, the window is solved towards the
+# Chebyshev center of the frontier region that minimizes the distance from
+# the current position plus a heuristic cost-to-go, the shortest distance
+# between region centers from that region to the goal. The robot then
+# executes the first `execute` regions of the plan and the window slides.
+#
+# gcs_factory(regions, edges) builds the problem of a window (e.g. a
+# BezierGCS with its costs and solver).
+class RecedingHorizonGCS:
+    def __init__(self, regions, edges, horizon=5, gcs_factory=LinearGCS, execute=1):
+        assert horizon >= 1 and execute >= 1
+        self.regions = list(regions)
+        self.edges = np.array(edges, dtype=int).reshape(-1, 2)
+        self.horizon = horizon
+        self.gcs_factory = gcs_factory
+        self.execute = execute
+
+        self.region_store = RegionStore(self.regions)
+        self.centers = self.region_store.chebyshevCenters()
+        tails, heads = self.edges[:, 0], self.edges[:, 1]
+        # Zero weights would be dropped as missing entries of the sparse graph.
+        weights = np.maximum(
+            np.linalg.norm(self.centers[heads] - self.centers[tails], axis=1), 1e-12)
+        num_regions = len(self.regions)
+        self.graph = csr_matrix((weights, (tails, heads)), shape=(num_regions, num_regions))
+
+    # Regions within horizon hops of cells, and their hop counts.
+    def windowRegions(self, cells):
+        hops = np.full(len(self.regions), -1)
+        hops[cells] = 0
+        frontier = np.asarray(cells)
+        for h in range(1, self.horizon + 1):
+            neighbors = np.unique(np.concatenate(
+                [self.graph.indices[self.graph.indptr[i]:self.graph.indptr[i + 1]]
+                 for i in frontier] + [np.empty(0, dtype=int)]))
+            frontier = neighbors[hops[neighbors] < 0]
+            hops[frontier] = h
+        window = np.flatnonzero(hops >= 0)
+        return window, hops[window]
+
+    def windowGCS(self, window):
+        index = -np.ones(len(self.regions), dtype=int)
+        index[window] = np.arange(len(window))
+        inside = (index[self.edges[:, 0]] >= 0) & (index[self.edges[:, 1]] >= 0)
+        edges = [(int(index[ii]), int(index[jj])) for ii, jj in self.edges[inside]]
+        return self.gcs_factory([self.regions[ii] for ii in window], edges)
+
+    def subgoal(self, cells, window, hops, cost_to_go):
+        frontier = np.flatnonzero(hops == np.max(hops))
+        distances = dijkstra(self.graph[window][:, window],
+                             indices=np.flatnonzero(np.isin(window, cells)), min_only=True)
+        scores = distances[frontier] + cost_to_go[window[frontier]]
+        return self.centers[window[frontier[np.argmin(scores)]]]
+
+    # Plans from source to goal window by window. Returns one dictionary per
+    # step with the start position, the window's target, the number of
+    # regions in the window, the step time and the output of the window's
+    # SolvePath. Keyword arguments are passed to addSourceTarget.
+    def SolvePath(self, source, goal, rounding=True, preprocessing=False,
+                  max_steps=None, **endpoint_kwargs):
+        goal_cells = np.flatnonzero(self.region_store.contains(goal))
+        if len(goal_cells) == 0:
+            raise ValueError('Goal is not in any region.')
+        cost_to_go = dijkstra(self.graph.T.tocsr(), indices=goal_cells, min_only=True)
+        if max_steps is None:
+            max_steps = len(self.regions)
+
+        steps = []
+        position = np.asarray(source, dtype=float)
+        for _ in range(max_steps):
+            start_time = time.time()
+            cells = np.flatnonzero(self.region_store.contains(position))
+            if len(cells) == 0:
+                raise ValueError('Position is not in any region.')
+            window, hops = self.windowRegions(cells)
+            final = np.any(np.isin(goal_cells, window))
+            target = goal if final else self.subgoal(cells, window, hops, cost_to_go)
+
+            gcs = self.windowGCS(window)
+            gcs.addSourceTarget(position, target, **endpoint_kwargs)
+            solution = gcs.SolvePath(rounding, False, preprocessing)
+            steps.append({"position": position,
+                          "target": target,
+                          "window_regions": len(window),
+                          "solution": solution,
+                          "time": time.time() - start_time})
+
+            best_path = solution[-1]
+            if best_path is None or final:
+                break
+            best_result = solution[-2]["best_result"]
+            k = min(self.execute, len(best_path) - 1)
+            position = best_result.GetSolution(best_path[k].xv())[:len(position)]
+        return steps
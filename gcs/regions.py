@@ -0,0 +1,107 @@
+import numpy as np
+
+from gcs.spatial import boundingBox
+
+# Contiguous storage for a list of HPolyhedron regions. The halfspace
+# matrices of all regions are stacked into one (rows, dimension) buffer and
+# region ii owns rows offsets[ii]:offsets[ii + 1]. Bounding boxes and
+# Chebyshev balls are computed once, on first use, and exposed as arrays.
+class RegionStore:
+    def __init__(self, regions):
+        assert len(regions) > 0
+        self.dimension = regions[0].ambient_dimension()
+        self.A_stack = np.vstack([r.A() for r in regions])
+        self.b_stack = np.concatenate([r.b() for r in regions])
+        self.offsets = np.concatenate(
+            ([0], np.cumsum([r.b().size for r in regions])))
+        self.regions = list(regions)
+
+        self.lower = None
+        self.upper = None
+        self.centers = None
+        self.radii = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def A(self, ii):
+        return self.A_stack[self.offsets[ii]:self.offsets[ii + 1]]
+
+    def b(self, ii):
+        return self.b_stack[self.offsets[ii]:self.offsets[ii + 1]]
+
+    def boundingBoxes(self):
+        if self.lower is None:
+            self.lower = np.empty((len(self), self.dimension))
+            self.upper = np.empty((len(self), self.dimension))
+            for ii in range(len(self)):
+                self.lower[ii], self.upper[ii] = boundingBox(self.A(ii), self.b(ii))
+        return self.lower, self.upper
+
+    def chebyshevCenter(self, ii):
+        # The midpoint of a bounded box region is one of its Chebyshev
+        # centers, and the box itself needs no LP.
+        if np.all(np.sum(self.A(ii) != 0, axis=1) == 1):
+            lower, upper = boundingBox(self.A(ii), self.b(ii))
+            if np.all(np.isfinite(lower)) and np.all(np.isfinite(upper)):
+                return 0.5 * (lower + upper)
+        return self.regions[ii].ChebyshevCenter()
+
+    def chebyshevCenters(self):
+        if self.centers is None:
+            self.centers = np.array(
+                [self.chebyshevCenter(ii) for ii in range(len(self))])
+        return self.centers
+
+    def chebyshevRadii(self):
+        if self.radii is None:
+            centers = self.chebyshevCenters()
+            row_norms = np.linalg.norm(self.A_stack, axis=1)
+            row_centers = np.repeat(centers, np.diff(self.offsets), axis=0)
+            distances = (self.b_stack - np.sum(self.A_stack * row_centers, axis=1)) \
+                / row_norms
+            self.radii = np.minimum.reduceat(distances, self.offsets[:-1])
+        return self.radii
+
+    # Appending or removing a region only touches that region's rows and
+    # summaries; caches that were already computed stay valid.
+    def append(self, region):
+        assert region.ambient_dimension() == self.dimension
+        self.A_stack = np.vstack((self.A_stack, region.A()))
+        self.b_stack = np.concatenate((self.b_stack, region.b()))
+        self.offsets = np.append(self.offsets, self.offsets[-1] + region.b().size)
+        self.regions.append(region)
+
+        ii = len(self) - 1
+        if self.lower is not None:
+            lower, upper = boundingBox(self.A(ii), self.b(ii))
+            self.lower = np.vstack((self.lower, lower))
+            self.upper = np.vstack((self.upper, upper))
+        if self.centers is not None:
+            self.centers = np.vstack((self.centers, self.chebyshevCenter(ii)))
+        self.radii = None
+
+    def remove(self, ii):
+        start, end = self.offsets[ii], self.offsets[ii + 1]
+        self.A_stack = np.delete(self.A_stack, np.s_[start:end], axis=0)
+        self.b_stack = np.delete(self.b_stack, np.s_[start:end])
+        self.offsets = np.concatenate(
+            (self.offsets[:ii + 1], self.offsets[ii + 2:] - (end - start)))
+        del self.regions[ii]
+
+        if self.lower is not None:
+            self.lower = np.delete(self.lower, ii, axis=0)
+            self.upper = np.delete(self.upper, ii, axis=0)
+        if self.centers is not None:
+            self.centers = np.delete(self.centers, ii, axis=0)
+        if self.radii is not None:
+            self.radii = np.delete(self.radii, ii)
+
+    # Boolean mask of the regions (all of them, or only those listed in
+    # indices) that contain x.
+    def contains(self, x, indices=None, tol=1e-8):
+        if indices is None:
+            residual = self.A_stack.dot(x) - self.b_stack
+            return np.maximum.reduceat(residual, self.offsets[:-1]) <= tol
+        return np.array([np.all(self.A(ii).dot(x) <= self.b(ii) + tol)
+                         for ii in indices], dtype=bool)
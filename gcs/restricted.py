@@ -0,0 +1,165 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from pydrake.solvers import (
+    L2NormCost,
+    MathematicalProgram,
+    PerspectiveQuadraticCost,
+    Solve,
+    SolutionResult,
+)
+
+# Convex restriction of a GraphOfConvexSets to a single path. The program
+# is built over the original vertex variables, so the returned result can be
+# queried with GetSolution(edge.xu()) / GetSolution(edge.xv()) for the path
+# edges exactly like a result of the full graph. The graph itself is never
+# modified, which lets several paths be solved concurrently.
+
+def pathVertices(path_edges):
+    return [path_edges[0].u()] + [e.v() for e in path_edges]
+
+# Costs that GraphOfConvexSets handles through conic reformulations are
+# rewritten with an epigraph variable; all others are added unchanged.
+def addPathCost(prog, binding):
+    cost = binding.evaluator()
+    x = binding.variables()
+    if isinstance(cost, L2NormCost):
+        A = cost.GetDenseA()
+        t = prog.NewContinuousVariables(1, "t")
+        A_cone = np.block([[np.ones((1, 1)), np.zeros((1, len(x)))],
+                           [np.zeros((A.shape[0], 1)), A]])
+        b_cone = np.concatenate(([0.], cost.b()))
+        prog.AddLorentzConeConstraint(A_cone, b_cone, np.concatenate((t, x)))
+        prog.AddLinearCost(np.ones(1), 0., t)
+    elif isinstance(cost, PerspectiveQuadraticCost):
+        A = cost.A()
+        t = prog.NewContinuousVariables(1, "t")
+        A_cone = np.block([[np.ones((1, 1)), np.zeros((1, len(x)))],
+                           [np.zeros((A.shape[0], 1)), A]])
+        b_cone = np.concatenate(([0.], cost.b()))
+        prog.AddRotatedLorentzConeConstraint(A_cone, b_cone, np.concatenate((t, x)))
+        prog.AddLinearCost(np.ones(1), 0., t)
+    else:
+        prog.AddCost(binding)
+
+def buildPathProgram(path_edges):
+    prog = MathematicalProgram()
+    for v in pathVertices(path_edges):
+        prog.AddDecisionVariables(v.x())
+        v.set().AddPointInSetConstraints(prog, v.x())
+        for binding in v.GetCosts():
+            addPathCost(prog, binding)
+        for binding in v.GetConstraints():
+            prog.AddConstraint(binding)
+
+    for e in path_edges:
+        for binding in e.GetCosts():
+            addPathCost(prog, binding)
+        for binding in e.GetConstraints():
+            prog.AddConstraint(binding)
+    return prog
+
+def solvePathProgram(path_edges, solver=None, solver_options=None):
+    prog = buildPathProgram(path_edges)
+    if solver is None:
+        return Solve(prog, None, solver_options)
+    return solver.Solve(prog, None, solver_options)
+
+class CachedSolverDetails:
+    optimizer_time = 0.
+
+# Solution of a path program served from a RestrictionCache. The values are
+# stored per position along the path and bound to the vertices of the path
+# it is returned for, whose endpoint vertices may have been recreated since
+# the solve. It answers the queries of a restricted result.
+class PathSolution:
+    def __init__(self, path_edges, values, cost, solution_result):
+        self.variable_values = {}
+        if values is not None:
+            for v, x in zip(pathVertices(path_edges), values):
+                for var, value in zip(v.x(), x):
+                    self.variable_values[var.get_id()] = value
+        self.cost = cost
+        self.solution_result = solution_result
+
+    def GetSolution(self, var):
+        if isinstance(var, np.ndarray):
+            return np.array([self.variable_values.get(v.get_id(), np.nan) for v in var.flat]) \
+                .reshape(var.shape)
+        return self.variable_values.get(var.get_id(), np.nan)
+
+    def is_success(self):
+        return self.solution_result == SolutionResult.kSolutionFound
+
+    def get_optimal_cost(self):
+        return self.cost
+
+    def get_solution_result(self):
+        return self.solution_result
+
+    def get_solver_details(self):
+        return CachedSolverDetails()
+
+# Least recently used cache of path program solutions. Keys are built by the
+# caller (see BaseGCS.restrictionKey); only vertex values, cost and status
+# are kept. Results that did not end in a solution or a proof of
+# infeasibility (e.g. time limits) are not cached. At most max_entries
+# solutions and, if given, max_bytes bytes of vertex values are kept.
+class RestrictionCache:
+    def __init__(self, max_entries=1024, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, path_edges):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        return PathSolution(path_edges, *entry[:-1])
+
+    def put(self, key, path_edges, result):
+        solution_result = result.get_solution_result()
+        if solution_result not in [SolutionResult.kSolutionFound,
+                                   SolutionResult.kInfeasibleConstraints]:
+            return
+        values = None
+        num_bytes = 0
+        if result.is_success():
+            values = [result.GetSolution(v.x()) for v in pathVertices(path_edges)]
+            num_bytes = sum(x.nbytes for x in values)
+        with self.lock:
+            if key in self.entries:
+                self.num_bytes -= self.entries.pop(key)[-1]
+            self.entries[key] = (values, result.get_optimal_cost(), solution_result, num_bytes)
+            self.num_bytes += num_bytes
+            while len(self.entries) > 0 and (
+                len(self.entries) > self.max_entries
+                or (self.max_bytes is not None and self.num_bytes > self.max_bytes)):
+                self.num_bytes -= self.entries.popitem(last=False)[1][-1]
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.num_bytes = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "hit_rate": self.hits / lookups if lookups > 0 else 0.,
+                    "evictions": self.evictions,
+                    "entries": len(self.entries),
+                    "bytes": self.num_bytes}
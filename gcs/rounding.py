@@ -1,6 +1,8 @@
 import networkx as nx
 import numpy as np
 
+from gcs.graph import GraphAdjacency
+
 # Helper functions used be various rounding strategies
 def depthFirst(source, target, getCandidateEdgesFn, edgeSelectorFn):
     visited_vertices = [source]
@@ -18,17 +20,16 @@ def depthFirst(source, target, getCandidateEdgesFn, edgeSelectorFn):
             path_edges.append(next_edge)
     return path_edges
 
-def incomingEdges(gcs):
-    incoming_edges = {v.id(): [] for v in gcs.Vertices()}
-    for e in gcs.Edges():
-        incoming_edges[e.v().id()].append(e)
-    return incoming_edges
+def graphAdjacency(gcs, adjacency=None):
+    return GraphAdjacency(gcs) if adjacency is None else adjacency
+
+def incomingEdges(gcs, adjacency=None):
+    adjacency = graphAdjacency(gcs, adjacency)
+    return {v.id(): adjacency.incoming(v) for v in adjacency.vertices}
 
-def outgoingEdges(gcs):
-    outgoing_edges = {u.id(): [] for u in gcs.Vertices()}
-    for e in gcs.Edges():
-        outgoing_edges[e.u().id()].append(e)
-    return outgoing_edges
+def outgoingEdges(gcs, adjacency=None):
+    adjacency = graphAdjacency(gcs, adjacency)
+    return {u.id(): adjacency.outgoing(u) for u in adjacency.vertices}
 
 def extractEdgeFlows(gcs, result):
     return {e.id(): result.GetSolution(e.phi()) for e in gcs.Edges()}
@@ -43,14 +44,14 @@ def randomEdgeSelector(candidate_edges, flows):
     return np.random.choice(candidate_edges, p=probabilities)
 
 # Rounding Strategies
-def greedyForwardPathSearch(gcs, result, source, target, flow_tol=1e-5, **kwargs):
+def greedyForwardPathSearch(gcs, result, source, target, flow_tol=1e-5, adjacency=None, **kwargs):
 
-    outgoing_edges = outgoingEdges(gcs)
+    adjacency = graphAdjacency(gcs, adjacency)
     flows = extractEdgeFlows(gcs, result)
 
     def getCandidateEdgesFn(current_vertex, visited_vertices):
         keepEdge = lambda e: e.v() not in visited_vertices and flows[e.id()] > flow_tol
-        return [e for e in outgoing_edges[current_vertex.id()] if keepEdge(e)]
+        return [e for e in adjacency.outgoing(current_vertex) if keepEdge(e)]
 
     def edgeSelectorFn(candidate_edges):
         e = greedyEdgeSelector(candidate_edges, flows)
@@ -68,17 +69,17 @@ def runTrials(source, target, getCandidateEdgesFn, edgeSelectorFn, max_paths=10,
             paths.append(path)
     return paths
 
-def randomForwardPathSearch(gcs, result, source, target, max_paths=10, max_trials=100, seed=None, flow_tol=1e-5, **kwargs):
+def randomForwardPathSearch(gcs, result, source, target, max_paths=10, max_trials=100, seed=None, flow_tol=1e-5, adjacency=None, **kwargs):
 
     if seed is not None:
         np.random.seed(seed)
 
-    outgoing_edges = outgoingEdges(gcs)
+    adjacency = graphAdjacency(gcs, adjacency)
     flows = extractEdgeFlows(gcs, result)
 
     def getCandidateEdgesFn(current_vertex, visited_vertices):
         keepEdge = lambda e: e.v() not in visited_vertices and flows[e.id()] > flow_tol
-        return [e for e in outgoing_edges[current_vertex.id()] if keepEdge(e)]
+        return [e for e in adjacency.outgoing(current_vertex) if keepEdge(e)]
 
     def edgeSelectorFn(candidate_edges):
         e = randomEdgeSelector(candidate_edges, flows)
@@ -86,14 +87,14 @@ def randomForwardPathSearch(gcs, result, source, target, max_paths=10, max_trial
 
     return runTrials(source, target, getCandidateEdgesFn, edgeSelectorFn, max_paths, max_trials)
 
-def greedyBackwardPathSearch(gcs, result, source, target, flow_tol=1e-5, **kwargs):
+def greedyBackwardPathSearch(gcs, result, source, target, flow_tol=1e-5, adjacency=None, **kwargs):
 
-    incoming_edges = incomingEdges(gcs)
+    adjacency = graphAdjacency(gcs, adjacency)
     flows = extractEdgeFlows(gcs, result)
 
     def getCandidateEdgesFn(current_vertex, visited_vertices):
         keepEdge = lambda e: e.u() not in visited_vertices and flows[e.id()] > flow_tol
-        return [e for e in incoming_edges[current_vertex.id()] if keepEdge(e)]
+        return [e for e in adjacency.incoming(current_vertex) if keepEdge(e)]
 
     def edgeSelectorFn(candidate_edges):
         e = greedyEdgeSelector(candidate_edges, flows)
@@ -101,17 +102,17 @@ def greedyBackwardPathSearch(gcs, result, source, target, flow_tol=1e-5, **kwarg
 
     return [depthFirst(target, source, getCandidateEdgesFn, edgeSelectorFn)[::-1]]
 
-def randomBackwardPathSearch(gcs, result, source, target, max_paths=10, max_trials=100, seed=None, flow_tol=1e-5, **kwargs):
+def randomBackwardPathSearch(gcs, result, source, target, max_paths=10, max_trials=100, seed=None, flow_tol=1e-5, adjacency=None, **kwargs):
 
     if seed is not None:
         np.random.seed(seed)
 
-    incoming_edges = incomingEdges(gcs)
+    adjacency = graphAdjacency(gcs, adjacency)
     flows = extractEdgeFlows(gcs, result)
 
     def getCandidateEdgesFn(current_vertex, visited_vertices):
         keepEdge = lambda e: e.u() not in visited_vertices and flows[e.id()] > flow_tol
-        return [e for e in incoming_edges[current_vertex.id()] if keepEdge(e)]
+        return [e for e in adjacency.incoming(current_vertex) if keepEdge(e)]
 
     def edgeSelectorFn(candidate_edges):
         e = randomEdgeSelector(candidate_edges, flows)
@@ -121,42 +122,70 @@ def randomBackwardPathSearch(gcs, result, source, target, max_paths=10, max_tria
 
     return [path[::-1] for path in runTrials(target, source, getCandidateEdgesFn, edgeSelectorFn, max_paths, max_trials)]
 
-def MipPathExtraction(gcs, result, source, target, **kwargs):
-    return greedyForwardPathSearch(gcs, result, source, target)
+def MipPathExtraction(gcs, result, source, target, adjacency=None, **kwargs):
+    return greedyForwardPathSearch(gcs, result, source, target, adjacency=adjacency)
 
-def averageVertexPositionGcs(gcs, result, source, target, flow_min=1e-3, **kwargs):
+# Flow-weighted average of each vertex's position in a relaxed solution,
+# falling back to the Chebyshev center for vertices carrying almost no flow.
+# centers maps vertex ids to precomputed fallback positions (see
+# BaseGCS.vertexCenters); only vertices missing from it solve for their
+# Chebyshev center. With vertices given, only those are evaluated.
+def averageVertexPositions(gcs, result, target, flow_min=1e-3, adjacency=None, centers=None, vertices=None):
 
-    G = nx.DiGraph()
-    G.add_nodes_from(gcs.Vertices())
+    adjacency = graphAdjacency(gcs, adjacency)
+    if vertices is None:
+        vertices = adjacency.vertices
 
     vertex_data = {}
-    for v in gcs.Vertices():
-        vertex_data[v.id()] = np.zeros(v.set().ambient_dimension() + 1)
-
-    for e in gcs.Edges():
-        vertex_data[e.u().id()][:-1] += e.GetSolutionPhiXu(result)
-        vertex_data[e.u().id()][-1] += result.GetSolution(e.phi())
-        if e.v() == target:
-            vertex_data[target.id()][:-1] += e.GetSolutionPhiXv(result)
-            vertex_data[target.id()][-1] += result.GetSolution(e.phi())
-
-    for v in gcs.Vertices():
-        if vertex_data[v.id()][-1] > flow_min:
-            vertex_data[v.id()] = vertex_data[v.id()][:-1] / vertex_data[v.id()][-1]
+    for v in vertices:
+        data = np.zeros(v.set().ambient_dimension() + 1)
+        for e in adjacency.outgoing(v):
+            data[:-1] += e.GetSolutionPhiXu(result)
+            data[-1] += result.GetSolution(e.phi())
+        if v == target:
+            for e in adjacency.incoming(v):
+                data[:-1] += e.GetSolutionPhiXv(result)
+                data[-1] += result.GetSolution(e.phi())
+
+        if data[-1] > flow_min:
+            vertex_data[v.id()] = data[:-1] / data[-1]
+        elif centers is not None and v.id() in centers:
+            vertex_data[v.id()] = centers[v.id()]
         else:
             vertex_data[v.id()] = v.set().ChebyshevCenter()
 
-    for e in gcs.Edges():
+    return vertex_data
+
+def evaluateEdgeCost(e, vertex_data):
+    e_cost = 0
+    for cost in e.GetCosts():
+        if len(cost.variables()) == e.u().set().ambient_dimension():
+            e_cost += cost.evaluator().Eval(vertex_data[e.u().id()])
+        elif len(cost.variables()) == e.u().set().ambient_dimension() + e.v().set().ambient_dimension():
+            e_cost += cost.evaluator().Eval(np.append(vertex_data[e.u().id()], vertex_data[e.v().id()]))
+        else:
+            raise Exception("Unclear what variables are used in this cost.")
+    return np.squeeze(e_cost)
+
+# Cheap estimate of the cost of a candidate path, used to rank candidates
+# before solving them. Undefined estimates rank last.
+def estimatePathCost(path_edges, vertex_data):
+    if path_edges is None:
+        return np.inf
+    cost = sum(evaluateEdgeCost(e, vertex_data) for e in path_edges)
+    return np.inf if np.isnan(cost) else cost
+
+def averageVertexPositionGcs(gcs, result, source, target, flow_min=1e-3, adjacency=None, centers=None, **kwargs):
+
+    adjacency = graphAdjacency(gcs, adjacency)
+    vertex_data = averageVertexPositions(gcs, result, target, flow_min, adjacency, centers)
+
+    G = nx.DiGraph()
+    G.add_nodes_from(adjacency.vertices)
+
+    for e in adjacency.edges:
         G.add_edge(e.u(), e.v())
-        e_cost = 0
-        for cost in e.GetCosts():
-            if len(cost.variables()) == e.u().set().ambient_dimension():
-                e_cost += cost.evaluator().Eval(vertex_data[e.u().id()])
-            elif len(cost.variables()) == e.u().set().ambient_dimension() + e.v().set().ambient_dimension():
-                e_cost += cost.evaluator().Eval(np.append(vertex_data[e.u().id()], vertex_data[e.v().id()]))
-            else:
-                raise Exception("Unclear what variables are used in this cost.")
-        G.edges[e.u(), e.v()]['l'] = np.squeeze(e_cost)
+        G.edges[e.u(), e.v()]['l'] = evaluateEdgeCost(e, vertex_data)
         if G.edges[e.u(), e.v()]['l'] < 0:
             raise RuntimeError(f"Averaged length of edge {e} is negative. Consider increasing flow_min.")
 
@@ -164,9 +193,6 @@ def averageVertexPositionGcs(gcs, result, source, target, flow_min=1e-3, **kwarg
 
     path_edges = []
     for u, v in zip(path_vertices[:-1], path_vertices[1:]):
-        for e in gcs.Edges():
-            if e.u() == u and e.v() == v:
-                path_edges.append(e)
-                break
+        path_edges.append(adjacency.edge(u, v))
 
     return [path_edges]
@@ -0,0 +1,94 @@
+import heapq
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# A*-style best-first search over the vertices of a GraphOfConvexSets. A
+# search node is a path from the source; its cost g is the optimal cost of
+# the convex restriction of the graph to that path, which can only grow as
+# the path is extended. Nodes are ordered by g + heuristic_weight * h(v),
+# where h is an admissible bound on the cost-to-go from the last vertex v.
+#
+# Since g of a path to v also depends on where the path ends inside v, a
+# path is kept only if it reaches v cheaper than every earlier path to v.
+# This keeps the search polynomial but, unlike the full relaxation, gives
+# no optimality guarantee. A vertex expanded again through a cheaper path
+# counts as a re-expansion.
+#
+# adjacency is a GraphAdjacency, source and target are vertex indices into
+# it, heuristic is indexed like adjacency.vertices and solve_fn(path_edges)
+# returns the MathematicalProgramResult of the restriction to path_edges.
+# The search gives up after max_expansions expansions or at the deadline.
+def bestFirstSearch(adjacency, source, target, heuristic, solve_fn,
+                    heuristic_weight=1., max_expansions=None, workers=None,
+                    deadline=None, tol=1e-9):
+    start_time = time.time()
+    stats = {"expansions": 0,
+             "reexpansions": 0,
+             "solves": 0,
+             "expansions_per_vertex": np.zeros(adjacency.num_vertices, dtype=int),
+             "expansion_solve_times": [],
+             "expansion_wall_times": []}
+
+    best_g = np.full(adjacency.num_vertices, np.inf)
+    best_g[source] = 0.
+    tie_breaker = 0
+    queue = [(heuristic_weight * heuristic[source], tie_breaker, 0., (), None)]
+    executor = None if workers is None or workers <= 1 else ThreadPoolExecutor(max_workers=workers)
+
+    best_path = None
+    best_result = None
+    try:
+        while queue:
+            _, _, g, path, result = heapq.heappop(queue)
+            v = source if len(path) == 0 else adjacency.heads[path[-1]]
+            if v == target:
+                best_path = [adjacency.edges[k] for k in path]
+                best_result = result
+                break
+            # Stale entry, a cheaper path to v was found after it was queued.
+            if g > best_g[v] + tol:
+                continue
+            if max_expansions is not None and stats["expansions"] >= max_expansions:
+                break
+            if deadline is not None and time.time() >= deadline:
+                break
+
+            expansion_start = time.time()
+            stats["expansions"] += 1
+            if stats["expansions_per_vertex"][v] > 0:
+                stats["reexpansions"] += 1
+            stats["expansions_per_vertex"][v] += 1
+
+            visited = set([source]) | set(adjacency.heads[list(path)])
+            children = [path + (int(k),) for k in adjacency.outgoingIndices(v)
+                        if adjacency.heads[k] not in visited
+                        and np.isfinite(heuristic[adjacency.heads[k]])]
+            child_edges = [[adjacency.edges[k] for k in child] for child in children]
+            if executor is None:
+                child_results = [solve_fn(edges) for edges in child_edges]
+            else:
+                child_results = list(executor.map(solve_fn, child_edges))
+            stats["solves"] += len(children)
+
+            solve_time = 0.
+            for child, child_result in zip(children, child_results):
+                solve_time += child_result.get_solver_details().optimizer_time
+                if not child_result.is_success():
+                    continue
+                w = adjacency.heads[child[-1]]
+                child_g = child_result.get_optimal_cost()
+                if child_g < best_g[w] - tol:
+                    best_g[w] = child_g
+                    tie_breaker += 1
+                    heapq.heappush(queue, (child_g + heuristic_weight * heuristic[w],
+                                           tie_breaker, child_g, child, child_result))
+            stats["expansion_solve_times"].append(solve_time)
+            stats["expansion_wall_times"].append(time.time() - expansion_start)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    stats["total_time"] = time.time() - start_time
+    return best_path, best_result, stats
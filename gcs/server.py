@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+import pickle
+import socketserver
+import sys
+import threading
+import time
+
+import numpy as np
+from pydrake.solvers import CommonSolverOption, MosekSolver
+
+from gcs import util
+from gcs.bezier import BezierGCS
+from gcs.linear import LinearGCS
+from gcs.rounding import randomForwardPathSearch
+
+# Long running planner that builds a GCS once and answers plan requests as
+# JSON lines, either on stdin/stdout or on a local Unix socket. A request
+# looks like
+#   {"id": 0, "start": [...], "goal": [...], "options": {"rounding": true}}
+# and the response carries the planned path together with its timing:
+#   {"id": 0, "success": true, "path": {...}, "timing": {...}}
+# Requests are answered one at a time since they share the graph.
+
+def loadRegions(file_path):
+    if file_path.endswith(".csv"):
+        return util.DeserializeRegions(file_path)
+    with open(file_path, "rb") as f:
+        regions = pickle.load(f)
+    if isinstance(regions, dict):
+        return list(regions.values())
+    return regions
+
+def buildPlanner(args):
+    regions = loadRegions(args.regions)
+    edges = None if args.edges is None else util.DeserializeEdges(args.edges)
+
+    if args.planner == "linear":
+        gcs = LinearGCS(regions, edges, full_dim_overlap=args.full_dim_overlap)
+    else:
+        gcs = BezierGCS(regions, args.order, args.continuity, edges,
+                        hdot_min=args.hdot_min, full_dim_overlap=args.full_dim_overlap)
+        gcs.addTimeCost(args.time_cost)
+        gcs.addPathLengthCost(args.path_length_cost)
+        if args.velocity_limit is not None:
+            vel_limit = args.velocity_limit * np.ones(gcs.dimension)
+            gcs.addVelocityLimits(-vel_limit, vel_limit)
+        gcs.finalize()
+
+    gcs.setPaperSolverOptions()
+    # Stdout carries the protocol, so the solver log must stay off it.
+    gcs.options.solver_options.SetOption(CommonSolverOption.kPrintToConsole, 0)
+    gcs.setSolver(MosekSolver())
+    gcs.setRoundingStrategy(randomForwardPathSearch, max_paths=args.max_paths,
+                            max_trials=args.max_trials, seed=args.seed)
+    return gcs
+
+def serializePath(path):
+    if isinstance(path, np.ndarray):
+        return {"waypoints": path.T.tolist()}
+    path_traj = path.path_traj
+    time_traj = path.time_traj
+    return {"knots": np.asarray(path_traj.basis().knots()).tolist(),
+            "order": path_traj.basis().order(),
+            "path_control_points": np.hstack(path_traj.control_points()).T.tolist(),
+            "time_control_points": np.hstack(time_traj.control_points()).ravel().tolist(),
+            "duration": path.end_time() - path.start_time()}
+
+class PlanningServer:
+    def __init__(self, gcs):
+        self.gcs = gcs
+        self.lock = threading.Lock()
+
+    def plan(self, request):
+        response = {"id": request.get("id")}
+        options = dict(request.get("options", {}))
+        rounding = options.pop("rounding", True)
+        preprocessing = options.pop("preprocessing", False)
+        if "velocity" in options:
+            options["velocity"] = np.array(options["velocity"])
+
+        start_time = time.time()
+        with self.lock:
+            query_results, _ = self.gcs.solveBatch(
+                [(np.array(request["start"]), np.array(request["goal"]))],
+                rounding=rounding, preprocessing=preprocessing, **options)
+        query_result = query_results[0]
+
+        response["success"] = "path" in query_result
+        if "error" in query_result:
+            response["error"] = query_result["error"]
+        if response["success"]:
+            response["path"] = serializePath(query_result["path"])
+            response["cost"] = query_result["rounded_cost"]
+        response["timing"] = {
+            "total": time.time() - start_time,
+            "relaxation_solver_time": query_result.get(
+                "relaxation_solver_time", query_result.get("mip_solver_time")),
+            "rounded_solver_time": sum(
+                r.get_solver_details().optimizer_time
+                for r in query_result.get("rounded_results", []))}
+        return response
+
+    def handleLine(self, line):
+        try:
+            response = self.plan(json.loads(line))
+        except Exception as error:
+            response = {"success": False, "error": repr(error)}
+        return json.dumps(response) + "\n"
+
+    # Responses are the only output on stdout; prints from the planner are
+    # sent to stderr.
+    def serveStdio(self):
+        protocol = sys.stdout
+        sys.stdout = sys.stderr
+        try:
+            for line in sys.stdin:
+                if line.strip():
+                    protocol.write(self.handleLine(line))
+                    protocol.flush()
+        finally:
+            sys.stdout = protocol
+
+    def serveUnixSocket(self, socket_path):
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if line.strip():
+                        self.wfile.write(server.handleLine(line.decode()).encode())
+                        self.wfile.flush()
+
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        with socketserver.ThreadingUnixStreamServer(socket_path, Handler) as unix_server:
+            unix_server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Persistent GCS planning server.")
+    parser.add_argument("--regions", required=True,
+                        help="Regions as a pickled list/dict (.reg) or serialized csv.")
+    parser.add_argument("--edges", default=None, help="Serialized edge csv.")
+    parser.add_argument("--planner", choices=["linear", "bezier"], default="linear")
+    parser.add_argument("--full-dim-overlap", action="store_true")
+    parser.add_argument("--order", type=int, default=7)
+    parser.add_argument("--continuity", type=int, default=4)
+    parser.add_argument("--hdot-min", type=float, default=1e-3)
+    parser.add_argument("--time-cost", type=float, default=1.)
+    parser.add_argument("--path-length-cost", type=float, default=1.)
+    parser.add_argument("--velocity-limit", type=float, default=None)
+    parser.add_argument("--max-paths", type=int, default=10)
+    parser.add_argument("--max-trials", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--socket", default=None,
+                        help="Serve on this Unix socket instead of stdin/stdout.")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    server = PlanningServer(buildPlanner(args))
+    print("Built planner in", time.time() - start_time, "s", file=sys.stderr, flush=True)
+
+    if args.socket is None:
+        server.serveStdio()
+    else:
+        server.serveUnixSocket(args.socket)
+
+if __name__ == "__main__":
+    main()
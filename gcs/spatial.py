@@ -0,0 +1,157 @@
+import numpy as np
+from pydrake.solvers import MathematicalProgram, Solve
+
+def boundingBox(A, b):
+    m, n = A.shape
+    lower = -np.inf * np.ones(n)
+    upper = np.inf * np.ones(n)
+
+    # Polytopes built only from axis aligned halfspaces (e.g. grid cells) have
+    # their box read directly off the rows.
+    nonzero = A != 0
+    if np.all(np.sum(nonzero, axis=1) == 1):
+        axes = np.argmax(nonzero, axis=1)
+        coeffs = A[np.arange(m), axes]
+        for k, a, bk in zip(axes, coeffs, b):
+            if a > 0:
+                upper[k] = min(upper[k], bk / a)
+            else:
+                lower[k] = max(lower[k], bk / a)
+        return lower, upper
+
+    prog = MathematicalProgram()
+    x = prog.NewContinuousVariables(n)
+    prog.AddLinearConstraint(A, -np.inf * np.ones(m), b, x)
+    cost = prog.AddLinearCost(np.zeros(n), 0., x).evaluator()
+
+    # Minimize and maximize each coordinate, reusing the same program.
+    for k in range(n):
+        for sign in [1., -1.]:
+            c = np.zeros(n)
+            c[k] = sign
+            cost.UpdateCoefficients(c, 0.)
+            result = Solve(prog)
+            # Unbounded (or empty) directions keep an infinite bound.
+            if not result.is_success():
+                continue
+            if sign > 0:
+                lower[k] = result.GetSolution(x[k])
+            else:
+                upper[k] = result.GetSolution(x[k])
+    return lower, upper
+
+# Indices of the boxes that overlap the single box [box_lower, box_upper].
+def overlappingBoxes(lower, upper, box_lower, box_upper, tol=1e-6):
+    overlap = np.all(lower <= box_upper + tol, axis=1) \
+        & np.all(box_lower <= upper + tol, axis=1)
+    return np.flatnonzero(overlap)
+
+# Sweep and prune over axis aligned boxes. Returns all pairs (ii, jj) with
+# ii < jj whose boxes overlap, sorted lexicographically.
+def overlappingBoxPairs(lower, upper, tol=1e-6):
+    num_boxes = lower.shape[0]
+    if num_boxes == 0:
+        return []
+
+    # Sweep along the axis on which the finite box centers are most spread.
+    finite = np.isfinite(lower) & np.isfinite(upper)
+    centers = 0.5 * (np.where(finite, lower, 0.) + np.where(finite, upper, 0.))
+    axis = int(np.argmax(np.ptp(centers, axis=0)))
+
+    order = np.argsort(lower[:, axis], kind="stable")
+    pairs = []
+    active = np.empty(0, dtype=int)
+    for ii in order:
+        # Drop boxes that end before the current one starts.
+        active = active[upper[active, axis] + tol >= lower[ii, axis]]
+        if len(active) > 0:
+            overlap = np.all(lower[active] <= upper[ii] + tol, axis=1) \
+                & np.all(lower[ii] <= upper[active] + tol, axis=1)
+            for jj in active[overlap]:
+                pairs.append((min(ii, jj), max(ii, jj)))
+        active = np.append(active, ii)
+    pairs.sort()
+    return [(int(ii), int(jj)) for ii, jj in pairs]
+
+# Bounding volume hierarchy over the region boxes, paired with the stacked
+# halfspace representation of every region. Point queries only descend into
+# nodes whose box contains the point and then check A x <= b on the few
+# remaining candidates in one vectorized product.
+class PointLocator:
+    def __init__(self, A, b, offsets, lower, upper, leaf_size=8):
+        self.A = A
+        self.b = b
+        self.offsets = offsets
+        self.leaf_size = leaf_size
+
+        finite = np.isfinite(lower) & np.isfinite(upper)
+        centers = 0.5 * (np.where(finite, lower, 0.) + np.where(finite, upper, 0.))
+
+        self.order = np.arange(lower.shape[0])
+        self.node_lower = []
+        self.node_upper = []
+        self.node_range = []
+        self.node_children = []
+
+        if lower.shape[0] == 0:
+            return
+        stack = [(0, lower.shape[0], None, 0)]
+        while len(stack) > 0:
+            start, end, parent, side = stack.pop()
+            idx = self.order[start:end]
+            node = len(self.node_range)
+            self.node_lower.append(np.min(lower[idx], axis=0))
+            self.node_upper.append(np.max(upper[idx], axis=0))
+            self.node_range.append((start, end))
+            self.node_children.append([-1, -1])
+            if parent is not None:
+                self.node_children[parent][side] = node
+            if end - start <= leaf_size:
+                continue
+
+            # Median split along the axis with the largest center spread.
+            axis = np.argmax(np.ptp(centers[idx], axis=0))
+            self.order[start:end] = idx[np.argsort(centers[idx, axis], kind="stable")]
+            mid = (start + end) // 2
+            stack.append((mid, end, node, 1))
+            stack.append((start, mid, node, 0))
+
+        self.node_lower = np.array(self.node_lower)
+        self.node_upper = np.array(self.node_upper)
+
+    def candidates(self, x, tol=1e-8):
+        found = []
+        if len(self.node_range) == 0:
+            return found
+        stack = [0]
+        while len(stack) > 0:
+            node = stack.pop()
+            if (np.any(x < self.node_lower[node] - tol)
+                    or np.any(x > self.node_upper[node] + tol)):
+                continue
+            left, right = self.node_children[node]
+            if left < 0:
+                start, end = self.node_range[node]
+                found.extend(self.order[start:end])
+            else:
+                stack.append(right)
+                stack.append(left)
+        return found
+
+    # Regions that contain x, up to tol. The default matches the zero
+    # tolerance of HPolyhedron.PointInSet, so every located region also
+    # satisfies the endpoint's point-in-set constraint. Only the bounding box
+    # pruning keeps a small slack, to tolerate inexact boxes.
+    def locate(self, x, tol=0.):
+        x = np.asarray(x, dtype=float)
+        candidates = np.sort(np.array(self.candidates(x, max(tol, 1e-8)), dtype=int))
+        if len(candidates) == 0:
+            return []
+
+        starts = self.offsets[candidates]
+        counts = self.offsets[candidates + 1] - starts
+        rows = np.repeat(starts - np.cumsum(counts) + counts, counts) \
+            + np.arange(np.sum(counts))
+        residual = self.A[rows].dot(x) - self.b[rows]
+        worst = np.maximum.reduceat(residual, np.cumsum(counts) - counts)
+        return [int(ii) for ii in candidates[worst <= tol]]
@@ -0,0 +1,83 @@
+import heapq
+import itertools
+
+import networkx as nx
+import numpy as np
+
+# Cheap surrogate of a GraphOfConvexSets: every vertex is represented by a
+# single point (e.g. the Chebyshev center of its region) and every edge is
+# weighted by the distance between the points of its endpoints. Vertices and
+# edges are referred to by their indices in a GraphAdjacency (or any other
+# IndexGraph).
+
+def edgeLengths(adjacency, positions):
+    return np.linalg.norm(positions[adjacency.heads] - positions[adjacency.tails], axis=1)
+
+# Distances from (or, with reverse=True, to) the source vertex and the index
+# of the edge through which each vertex was reached (-1 if none).
+def dijkstra(adjacency, weights, source, reverse=False):
+    num_vertices = adjacency.num_vertices
+    edge_indices = adjacency.incomingIndices if reverse else adjacency.outgoingIndices
+    neighbors = adjacency.tails if reverse else adjacency.heads
+
+    distances = np.full(num_vertices, np.inf)
+    predecessors = np.full(num_vertices, -1, dtype=int)
+    distances[source] = 0.
+    queue = [(0., source)]
+    while queue:
+        d, i = heapq.heappop(queue)
+        if d > distances[i]:
+            continue
+        for k in edge_indices(i):
+            j = neighbors[k]
+            if d + weights[k] < distances[j]:
+                distances[j] = d + weights[k]
+                predecessors[j] = k
+                heapq.heappush(queue, (distances[j], j))
+    return distances, predecessors
+
+# Edge indices of a shortest source-target path, or None if there is none.
+def shortestPath(adjacency, weights, source, target):
+    distances, predecessors = dijkstra(adjacency, weights, source)
+    if not np.isfinite(distances[target]):
+        return None
+    path = []
+    i = target
+    while i != source:
+        k = predecessors[i]
+        path.append(int(k))
+        i = adjacency.tails[k]
+    return path[::-1]
+
+# Edge indices of up to k shortest simple source-target paths, shortest
+# first (Yen's algorithm).
+def kShortestPaths(adjacency, weights, source, target, k):
+    graph = nx.DiGraph()
+    graph.add_nodes_from(range(adjacency.num_vertices))
+    for (i, j), kk in adjacency.edge_map.items():
+        graph.add_edge(i, j, weight=weights[kk])
+    try:
+        vertex_paths = list(itertools.islice(
+            nx.shortest_simple_paths(graph, source, target, weight="weight"), k))
+    except nx.NetworkXNoPath:
+        return []
+    return [[adjacency.edge_map[(i, j)] for i, j in zip(path[:-1], path[1:])]
+            for path in vertex_paths]
+
+# Boolean mask of the vertices on the given paths and of all vertices within
+# halo hops of them, ignoring edge directions.
+def corridorVertices(adjacency, paths, halo=0):
+    inside = np.zeros(adjacency.num_vertices, dtype=bool)
+    for path in paths:
+        inside[adjacency.tails[path]] = True
+        inside[adjacency.heads[path]] = True
+    frontier = np.flatnonzero(inside)
+    for _ in range(halo):
+        neighbors = [adjacency.heads[adjacency.outgoingIndices(i)] for i in frontier] \
+            + [adjacency.tails[adjacency.incomingIndices(i)] for i in frontier]
+        if len(neighbors) == 0:
+            break
+        neighbors = np.unique(np.concatenate(neighbors))
+        frontier = neighbors[~inside[neighbors]]
+        inside[frontier] = True
+    return inside
@@ -1,4 +1,6 @@
+import hashlib
 import os
+import tempfile
 import numpy as np
 from pydrake.geometry.optimization import HPolyhedron
 
@@ -71,3 +73,44 @@ def DeserializeEdges(file_path):
             edges.append((u, v))
 
     return edges
+
+def EdgeCacheDir():
+    return os.environ.get("GCS_EDGE_CACHE_DIR")
+
+def EdgeCacheKey(region_store, mode):
+    digest = hashlib.sha256()
+    digest.update(mode.encode())
+    for array in [region_store.offsets, region_store.A_stack, region_store.b_stack]:
+        array = np.ascontiguousarray(array)
+        digest.update(str(array.shape).encode())
+        digest.update(array.astype(np.float64).tobytes())
+    return digest.hexdigest()
+
+def LoadCachedEdges(cache_dir, key):
+    file_path = os.path.join(cache_dir, key + ".edges")
+    if not os.path.exists(file_path):
+        return None
+    return DeserializeEdges(file_path)
+
+def SaveCachedEdges(cache_dir, key, edges):
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write to a temporary file first so concurrent readers never see a
+    # partially written edge list.
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    os.close(fd)
+    SerializeEdges(edges, tmp_path)
+    os.replace(tmp_path, os.path.join(cache_dir, key + ".edges"))
+
+def LoadCachedArrays(cache_dir, key):
+    file_path = os.path.join(cache_dir, key + ".npz")
+    if not os.path.exists(file_path):
+        return None
+    with np.load(file_path) as data:
+        return {name: data[name] for name in data.files}
+
+def SaveCachedArrays(cache_dir, key, **arrays):
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".npz")
+    os.close(fd)
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, os.path.join(cache_dir, key + ".npz"))
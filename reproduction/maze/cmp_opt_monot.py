@@ -12,6 +12,7 @@ from gcs.linear import LinearGCS
 from models.maze import Maze
 
 from gcs import util
+from gcs.regions import RegionStore
 
 os.environ["MOSEKLM_LICENSE_FILE"] = "/home/gaussian/Documents/softwares/mosektoolslinux64x86/mosek.lic"
 MosekSolver.AcquireLicense()
@@ -35,6 +36,7 @@ while knock_downs > 0:
         knock_downs -= 1
 
 regions = util.DeserializeRegions('../data/maze2d/maze.csv')
+centers = RegionStore(regions).chebyshevCenters()
 edges = util.DeserializeEdges('../data/maze2d/maze_edges.csv')
 
 def is_monotonically_increasing(arr):
@@ -58,8 +60,7 @@ full_path = [1, 51, 52, 2, 3, 4, 54, 104, 154, 204, 203, 202, 252, 302, 301, 351
 
 region_centers = []
 for cell in full_path:
-    r = regions[cell-1]
-    ctrs = r.ChebyshevCenter()
+    ctrs = centers[cell-1]
     region_centers.append(ctrs)
 
 opt_type = 'gcsopt'
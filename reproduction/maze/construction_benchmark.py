@@ -0,0 +1,46 @@
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+from pydrake.solvers import LinearConstraint
+
+from gcs.linear import LinearGCS
+
+from gcs import util
+
+# Construction time and peak memory of LinearGCS on the 2500-cell maze. The
+# "shared" mode binds one containment constraint per vertex to all of its
+# outgoing edges, "unshared" rebuilds the constraint for every edge as
+# LinearGCS used to. Each mode runs in its own process so that the peak
+# resident set sizes are comparable.
+
+class UnsharedLinearGCS(LinearGCS):
+    def vertexConstraint(self, u):
+        return LinearConstraint(u.set().A(),
+                                -np.inf*np.ones(len(u.set().b())),
+                                u.set().b())
+
+def construct(mode):
+    regions = util.DeserializeRegions('../data/maze2d/maze.csv')
+    edges = util.DeserializeEdges('../data/maze2d/maze_edges.csv')
+    gcs_class = LinearGCS if mode == "shared" else UnsharedLinearGCS
+
+    start_time = time.time()
+    gcs = gcs_class(regions, edges)
+    construction_time = time.time() - start_time
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+
+    print(mode, construction_time, peak_memory, len(gcs.gcs.Edges()))
+
+if len(sys.argv) > 1:
+    construct(sys.argv[1])
+else:
+    print("mode\t\tconstruction [s]\tpeak memory [MB]\tedges")
+    for mode in ["unshared", "shared"]:
+        output = subprocess.run([sys.executable, __file__, mode],
+                                capture_output=True, text=True, check=True)
+        name, construction_time, peak_memory, num_edges = output.stdout.split()[-4:]
+        print(f"{name}\t{float(construction_time):.3f}\t\t\t"
+              f"{float(peak_memory):.1f}\t\t\t{num_edges}")
@@ -0,0 +1,67 @@
+import sys
+import time
+
+import numpy as np
+from random import choice, randint, seed
+
+from pydrake.geometry.optimization import HPolyhedron
+from pydrake.solvers import MosekSolver
+
+from gcs.hierarchical import HierarchicalGCS
+from gcs.linear import LinearGCS
+from models.maze import Maze
+
+# Hierarchical versus flat minimum-distance solves on random mazes. Usage:
+#   python hierarchical_benchmark.py [maze_size] [block_size] [compare_flat]
+
+def make_maze(maze_size, knock_downs):
+    maze = Maze(maze_size, maze_size)
+    maze.make_maze()
+    while knock_downs > 0:
+        cell = maze.cell_at(randint(1, maze_size - 2), randint(1, maze_size - 2))
+        walls = [w for w, up in cell.walls.items() if up]
+        if len(walls) > 0:
+            maze.knock_down_wall(cell, choice(walls))
+            knock_downs -= 1
+
+    regions = []
+    edges = []
+    for x in range(maze_size):
+        for y in range(maze_size):
+            regions.append(HPolyhedron.MakeBox([x, y], [x+1., y+1.]))
+            C = y + x * maze.ny
+            if not maze.map[x][y].walls['N']:
+                edges.append((C, C + 1))
+            if not maze.map[x][y].walls['S']:
+                edges.append((C, C - 1))
+            if not maze.map[x][y].walls['E']:
+                edges.append((C, C + maze.ny))
+            if not maze.map[x][y].walls['W']:
+                edges.append((C, C - maze.ny))
+    return regions, edges
+
+def make_gcs(regions, edges):
+    gcs = LinearGCS(regions, edges)
+    gcs.setSolver(MosekSolver())
+    return gcs
+
+seed(4)
+maze_size = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+block_size = float(sys.argv[2]) if len(sys.argv) > 2 else 5.
+compare_flat = sys.argv[3] != "0" if len(sys.argv) > 3 else maze_size <= 50
+
+start = np.array([0.5, 0])
+goal = np.array([maze_size - 0.5, maze_size])
+regions, edges = make_maze(maze_size, maze_size * maze_size // 25)
+
+build_start = time.time()
+planner = HierarchicalGCS(regions, edges, block_size, make_gcs, MosekSolver())
+print("Built coarse graph with", len(planner.coarse_regions), "blocks in",
+      time.time() - build_start, "s")
+
+solution = planner.SolvePath(start, goal, rounding=True, compare_flat=compare_flat)
+stats = solution[-2]["hierarchy"]
+for key in ["coarse_time", "fine_time", "total_time", "halo", "fine_regions",
+            "region_fraction", "cost", "flat_time", "flat_cost", "cost_gap"]:
+    if key in stats:
+        print(key, stats[key])
@@ -15,24 +15,8 @@ from gcs.linear import LinearGCS
 from models.maze import Maze
 
 from gcs import util
-
-def loadDict(file_path):
-    # Read the content of the text file
-    with open(file_path, 'r') as file:
-        lines = file.readlines()
-
-    # Initialize an empty dictionary
-    data_dict = {}
-
-    # Parse each line and populate the dictionary
-    for line in lines:
-        parts = line.strip().split(':')
-        key = int(parts[0])
-        values = [float(value) for value in parts[1].split()]
-        data_dict[key] = values
-
-    return data_dict
-
+from gcs.lower_bounds import LowerBoundGraph
+from gcs.regions import RegionStore
 
 os.environ["MOSEKLM_LICENSE_FILE"] = "/home/gaussian/Documents/softwares/mosektoolslinux64x86/mosek.lic"
 MosekSolver.AcquireLicense()
@@ -56,23 +40,14 @@ while knock_downs > 0:
         knock_downs -= 1
 
 regions = util.DeserializeRegions('../data/maze2d/maze.csv')
+centers = RegionStore(regions).chebyshevCenters()
 edges = util.DeserializeEdges('../data/maze2d/maze_edges.csv')
-lbg_cost = np.loadtxt('../data/maze2d/maze_lbg.txt', delimiter=' ')
-lbg_adj = loadDict('../data/maze2d/lbg_adj.txt')
-newid_to_state = loadDict('../data/maze2d/newid_to_state.txt')
-lbg_adj_cost = loadDict('../data/maze2d/lbg_adj_cost.txt')
-
-xx = []
-yy = []
-col = []
-for val in lbg_cost:
-    vtx = val[0]
-    if vtx > len(regions):
-        continue
-    ctr = regions[int(vtx)-1].ChebyshevCenter()
-    xx.append(ctr[0])
-    yy.append(ctr[1])
-    col.append(val[1])
+lbg = LowerBoundGraph(regions, edges)
+vertex_bounds, edge_bounds = lbg.costToGo(goal)
+
+xx = centers[:, 0]
+yy = centers[:, 1]
+col = vertex_bounds
 
 def plot_maze():
     plt.figure(figsize=(5,5))
@@ -97,39 +72,13 @@ ax = plt.gca()
 edx = []
 edy = []
 costs = []
-plt_edges = {}
-for node in lbg_adj:
-    i=0
-    for neigh in lbg_adj[node]:
-        # Skip zero costs
-        # if lbg_adj_cost[node][i] < 1e-3:
-        #     i += 1
-        #     continue
-
-        # skip one of bidirectional edges
-        ed = (node, neigh)
-        ef = ed
-        ei = ed[::-1]
-        if ed in plt_edges or ei in plt_edges:
-            continue
-
-        plt_edges[ed] = True
-
-        costs.append(lbg_adj_cost[node][i])
-        # costs.append(abs(lbg_adj_cost[node][i]-1))
-        i+=1
-
-        edx.append(newid_to_state[node][0])
-        edx.append(newid_to_state[int(neigh)][0])
-        edy.append(newid_to_state[node][1])
-        edy.append(newid_to_state[int(neigh)][1])
-
-        # edx = [newid_to_state[node][0], newid_to_state[int(neigh)][0]]
-        # edy = [newid_to_state[node][1], newid_to_state[int(neigh)][1]]
-        # col = lbg_adj_cost[node][i]
-
-        # plt.plot(edx, edy, 'b-')
-        # plt.plot(edx, edy, c=col, cmap='viridis')
+for (u, v), cost in zip(lbg.edges, edge_bounds):
+    # Skip edges that cannot lie on a path to the goal.
+    if not np.isfinite(cost):
+        continue
+    costs.append(cost)
+    edx.extend([centers[u][0], centers[v][0]])
+    edy.extend([centers[u][1], centers[v][1]])
 
 # Create a colormap based on costs
 cmap = plt.get_cmap('bwr')
@@ -12,6 +12,7 @@ from gcs.linear import LinearGCS
 from models.maze import Maze
 
 from gcs import util
+from gcs.regions import RegionStore
 
 os.environ["MOSEKLM_LICENSE_FILE"] = "/home/gaussian/Documents/softwares/mosektoolslinux64x86/mosek.lic"
 MosekSolver.AcquireLicense()
@@ -35,6 +36,7 @@ while knock_downs > 0:
         knock_downs -= 1
 
 regions = util.DeserializeRegions('../data/maze2d/maze.csv')
+centers = RegionStore(regions).chebyshevCenters()
 edges = util.DeserializeEdges('../data/maze2d/maze_edges.csv')
 
 def plot_maze():
@@ -53,8 +55,8 @@ for e in edges:
     #     break
     if e[0] < 2490 or e[1] < 2490:
         continue
-    c1 = regions[e[0]].ChebyshevCenter()
-    c2 = regions[e[1]].ChebyshevCenter()
+    c1 = centers[e[0]]
+    c2 = centers[e[1]]
     edge_lines.append([c1, c2])
     annot_edges.append(e)
 
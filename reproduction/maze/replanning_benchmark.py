@@ -0,0 +1,62 @@
+import time
+
+import numpy as np
+from pydrake.solvers import MosekSolver
+
+from gcs.linear import LinearGCS
+from gcs.rounding import randomForwardPathSearch
+
+from gcs import util
+
+# Closed-loop replanning on the 2500-cell maze: the start moves a little
+# every cycle. "rebuild" calls addSourceTarget and solves from scratch,
+# "update" moves the source with updateEndpoints, which keeps the rest of the
+# graph and seeds rounding with the previous path.
+
+regions = util.DeserializeRegions('../data/maze2d/maze.csv')
+edges = util.DeserializeEdges('../data/maze2d/maze_edges.csv')
+
+maze_size = 50
+goal = np.array([maze_size - 0.5, maze_size])
+starts = [np.array([0.5, 0.05 * k]) for k in range(10)]
+
+def make_gcs():
+    gcs = LinearGCS(regions, edges)
+    gcs.setSolver(MosekSolver())
+    gcs.setRoundingStrategy(randomForwardPathSearch, max_paths=10, max_trials=100, seed=0)
+    gcs.setRestrictedRounding()
+    return gcs
+
+def rebuild_cycles():
+    gcs = make_gcs()
+    times = []
+    for start in starts:
+        start_time = time.time()
+        gcs.addSourceTarget(start, goal)
+        gcs.SolvePath(True)
+        times.append(time.time() - start_time)
+    # Timings are only meaningful on the full maze.
+    assert gcs.regionsIntact()
+    return times
+
+def update_cycles():
+    gcs = make_gcs()
+    gcs.addSourceTarget(starts[0], goal)
+    times = []
+    for k, start in enumerate(starts):
+        start_time = time.time()
+        if k > 0:
+            gcs.updateEndpoints(source=start)
+        gcs.SolvePath(True)
+        times.append(time.time() - start_time)
+    # Timings are only meaningful on the full maze.
+    assert gcs.regionsIntact()
+    return times
+
+rebuild_times = rebuild_cycles()
+update_times = update_cycles()
+print("cycle\trebuild [s]\tupdate [s]\tspeedup")
+for k, (t_rebuild, t_update) in enumerate(zip(rebuild_times, update_times)):
+    print(f"{k}\t{t_rebuild:.3f}\t\t{t_update:.3f}\t\t{t_rebuild / t_update:.2f}")
+print("mean speedup after the first cycle:",
+      np.mean(np.array(rebuild_times[1:]) / np.array(update_times[1:])))
@@ -5,7 +5,11 @@ from random import choice, randint
 
 from models.maze import Maze
 
+from pydrake.solvers import MosekSolver
+
 from gcs import util
+from gcs.linear import LinearGCS
+from gcs.regions import RegionStore
 
 maze_size = 50
 knock_downs = 100
@@ -23,23 +27,29 @@ while knock_downs > 0:
         knock_downs -= 1
 
 regions = util.DeserializeRegions('data/maze2d/maze.csv')
+centers = RegionStore(regions).chebyshevCenters()
 edges = util.DeserializeEdges('data/maze2d/maze_edges.csv')
-incom_edge_count = np.loadtxt('/home/gaussian/cmu_ri_phd/phd_research/ixg/logs/insatxgcs_incom_edge_count_1.txt', delimiter=' ')
-# incom_edge_count = np.loadtxt('/home/gaussian/cmu_ri_phd/phd_research/ixg/logs/insatxgcs_lb_cost.txt', delimiter=' ')
+
+# Expansions of every region in a weighted A* search (heuristic weight 1).
+gcs = LinearGCS(regions, edges)
+gcs.setSolver(MosekSolver())
+gcs.setBestFirstSearch(heuristic_weight=1.)
+gcs.addSourceTarget(start, goal)
+assert gcs.regionsIntact()
+solution = gcs.SolvePath(True)
+search = solution[-2]["search"]
+print("Expansions:", search["expansions"], "re-expansions:", search["reexpansions"])
+adjacency = gcs.adjacency()
+expansions = np.array([search["expansions_per_vertex"][adjacency.index(v)]
+                       for v in gcs.region_vertices])
 xx = []
 yy = []
 col = []
-clamp_div = 50
-for val in incom_edge_count:
-    vtx = val[0]
-    if vtx > len(regions):
-        continue
-    if val[1] > 990:
-        continue
-    ctr = regions[int(vtx)-1].ChebyshevCenter()
+for vtx in np.flatnonzero(expansions > 1):
+    ctr = centers[vtx]
     xx.append(ctr[0])
     yy.append(ctr[1])
-    col.append(val[1])
+    col.append(expansions[vtx] - 1)
 
 def plot_maze():
     plt.figure(figsize=(5,5))
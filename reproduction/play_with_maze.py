@@ -10,6 +10,7 @@ from gcs.linear import LinearGCS
 from models.maze import Maze
 
 from gcs import util
+from gcs.regions import RegionStore
 
 os.environ["MOSEKLM_LICENSE_FILE"] = "/home/gaussian/Documents/softwares/mosektoolslinux64x86/mosek.lic"
 MosekSolver.AcquireLicense()
@@ -50,6 +51,8 @@ while knock_downs > 0:
 # util.SerializeEdges(edges, './data/maze_edges.csv')
 
 regions = util.DeserializeRegions('data/maze2d/maze.csv')
+region_store = RegionStore(regions)
+centers = region_store.chebyshevCenters()
 edges = util.DeserializeEdges('data/maze2d/maze_edges.csv')
 
 
@@ -95,14 +98,13 @@ print(opt_soln.T.shape)
 # find the GCS ID path
 gcs_path = []
 for wp in opt_soln:
-    rid = 1
-    for r in regions:
-        if r.PointInSet(wp):
-            if len(gcs_path)>0 and gcs_path[-1] == rid:
-                break
-            gcs_path.append(rid)
-            break
-        rid+=1
+    inside = np.flatnonzero(region_store.contains(wp))
+    if len(inside) == 0:
+        continue
+    rid = inside[0] + 1
+    if len(gcs_path)>0 and gcs_path[-1] == rid:
+        continue
+    gcs_path.append(rid)
 
 print(gcs_path)
 
@@ -128,8 +130,7 @@ plt.plot(*opt_soln.T, 'r')
 
 region_centers = []
 for cell in gcs_path:
-    r = regions[cell-1]
-    ctrs = r.ChebyshevCenter()
+    ctrs = centers[cell-1]
     region_centers.append(ctrs)
 
 for ctrs in region_centers: